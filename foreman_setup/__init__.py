@@ -0,0 +1,8 @@
+# Foreman repo setup and installation as importable phases.
+# foreman_repo_builder.py and foreman_installer.py are thin wrappers around
+# foreman_setup.repos and foreman_setup.install; foreman_setup.orchestrator
+# runs repo setup and install in one process with one run history record.
+
+from foreman_setup.config import InstallConfig, RepoConfig, Session
+
+__all__ = ["InstallConfig", "RepoConfig", "Session"]
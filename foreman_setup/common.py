@@ -0,0 +1,118 @@
+# Terminal output and host command helpers shared by the repo builder and
+# the installer. Nothing here runs at import time.
+
+import os
+import platform
+import subprocess
+from sys import exit
+
+
+# Define terminal color output variables using ANSII codes
+class tcolor:
+    fl = '\033[0;31m'
+    flb = '\033[1;31m'
+    msg = '\033[0;36m'
+    pmt = '\033[1;36m'
+    wrn = '\033[0;33m'
+    wrnb = '\033[1;33m'
+    ok = '\033[0;32m'
+    okb = '\033[1;32m'
+    gen = '\033[0;35m'
+    dflt = '\033[0m'
+
+
+def clear_screen():
+    os.system('clear')
+
+
+def banner(text):
+    print('')
+    print(f"{tcolor.gen}-" * len(text))
+    print(f"{tcolor.gen}{text}")
+    print(f"{tcolor.gen}-{tcolor.dflt}" * len(text))
+    print('')
+
+
+# Check platform ID
+def platform_id():
+    # Get host release info
+    relid = platform.release()
+    try:
+        if relid.index("el8"):
+            pass
+    except ValueError:
+        print(f"{tcolor.flb}EL8 platform not detected!")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+
+
+def confirm():
+    # Returns "y", "n", or "" for anything else
+    uans = str.lower(str(input("(Y/n): ")))
+    if uans == str("y") or uans == str("yes"):
+        return "y"
+    if uans == str("n") or uans == str("no"):
+        return "n"
+    return ""
+
+
+def prompt_version(product):
+    print(f"{tcolor.pmt}What version of {product} are you targeting?")
+    print('')
+    print(f"{tcolor.msg}For a list of supported" +
+          f" versions, browse to:{tcolor.dflt}")
+    print("https://docs.theforeman.org")
+    print('')
+    while True:
+        try:
+            return str(float(input(tcolor.pmt + product + ": " +
+                                   tcolor.dflt)))
+        except ValueError:
+            print(f"{tcolor.fl}Invalid input!{tcolor.dflt}")
+
+
+# Subprocess functions for running commands directly on the host shell
+def enable_repo(repo_name):
+    subprocess.run(["sudo", "dnf", "repolist", "--enablerepo", repo_name])
+
+
+def install_package(package_name):
+    subprocess.run(["sudo", "dnf", "install", "-y", package_name])
+
+
+def update_package():
+    subprocess.run(["sudo", "dnf", "update", "-y"])
+
+
+def install_module(package_name):
+    subprocess.run(["sudo", "dnf", "module", "install", "-y", package_name])
+
+
+def enable_module(module_name):
+    subprocess.run(["sudo", "dnf", "module", "enable", "-y", module_name])
+
+
+def switch_module(module_name):
+    subprocess.run(["sudo", "dnf", "module", "switch-to", "-y", module_name])
+
+
+# Module streams per bundle profile, switched to and then enabled. A
+# content proxy runs Pulp, PostgreSQL and the Ruby smart proxy, so it
+# needs the same streams as a server
+module_streams = {
+    "server": {"switch": ["postgresql:12", "ruby:2.7"],
+               "enable": ["katello:el8", "pulpcore:el8"]},
+    "proxy": {"switch": ["postgresql:12", "ruby:2.7"],
+              "enable": ["katello:el8", "pulpcore:el8"]},
+}
+
+
+def configure_modules(profile="server"):
+    # Disable conflicting modules, and enable required modules
+    # Errors may be encountered if modules are already enabled/disabled
+    # These can be safely ignored. I will work on error handling later
+    streams = module_streams[profile]
+    for module_name in streams["switch"]:
+        switch_module(module_name)
+    for module_name in streams["enable"]:
+        enable_module(module_name)
@@ -0,0 +1,115 @@
+# Typed configuration for each phase, and the session state shared between
+# phases when the builder and installer run in one process.
+
+import copy
+import atexit
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+
+from foreman_setup import history
+
+if TYPE_CHECKING:
+    from foreman_setup import throttle
+
+
+class Config:
+    """Attributes are declared as annotated class defaults."""
+
+    def __init__(self, **kwargs):
+        for name in self.fields():
+            setattr(self, name, copy.copy(getattr(type(self), name)))
+        for name, value in kwargs.items():
+            if name not in self.fields():
+                raise TypeError(type(self).__name__ +
+                                " has no option " + repr(name))
+            setattr(self, name, value)
+
+    @classmethod
+    def fields(cls):
+        names = []
+        for klass in reversed(cls.__mro__):
+            names += [n for n in getattr(klass, "__annotations__", {})
+                      if n not in names]
+        return names
+
+    @classmethod
+    def from_args(cls, flg):
+        # Build from an argparse namespace, ignoring unrelated arguments
+        return cls(**{name: getattr(flg, name) for name in cls.fields()
+                      if hasattr(flg, name)})
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + ", ".join(
+            name + "=" + repr(getattr(self, name))
+            for name in self.fields()) + ")"
+
+
+class RepoConfig(Config):
+    """Options for building offline bundles or activating them."""
+
+    online: bool = False
+    offline: bool = False
+    noprompt: bool = False
+    foreman: str = ""
+    katello: str = ""
+    extract: str = ""
+    dest: str = ""
+    profile: str = "server"
+    jobs: int = 4
+    bwlimit: str = ""
+    window: List[str] = []
+    daemon: bool = False
+    interval: float = 24
+    keep: int = 7
+    snapshots: str = "foreman-snapshots"
+    outbox: str = "foreman-outbox"
+    delta: str = ""
+    rollback: bool = False
+    keep_releases: int = 2
+    history: str = history.history_db
+
+
+class InstallConfig(Config):
+    """Options for installing Foreman with foreman-installer."""
+
+    noprompt: bool = False
+    disconnected: bool = False
+    foreman: str = ""
+    katello: str = ""
+    loc: str = "Default_Location"
+    org: str = "Default_Organization"
+    tune: str = "default"
+    tune_dry_run: bool = False
+    username: str = "admin"
+    compute_resource: str = ""
+    prefetch: bool = True
+    mirror: str = ""
+    force_install: bool = False
+    setup_repos: bool = False
+    sample_interval: float = 5
+    samples: str = history.samples_dir
+    history: str = history.history_db
+
+
+class Session:
+    """State shared by every phase of one run: the run history record,
+    the activated version set and anything later phases can reuse."""
+
+    def __init__(self, script: str, args: Optional[dict] = None,
+                 dbpath: str = history.history_db):
+        self.run: Optional[history.Run] = None
+        self.version_set: Optional[dict] = None
+        self.shaper: Optional["throttle.Shaper"] = None
+        self.windows: list = []
+        if len(dbpath) > 0:
+            self.run = history.Run(script, args, dbpath)
+            atexit.register(self.run.finish, "exited")
+
+    def timed(self, step: str, func: Callable, *args,
+              path: Optional[str] = None) -> Any:
+        if self.run is None:
+            return func(*args)
+        return self.run.step(step, func, *args, path=path)
+
+    def finish(self, status: str = "complete"):
+        if self.run:
+            self.run.finish(status)
@@ -0,0 +1,227 @@
+# Run history for the Foreman repo builder and installer.
+# Each run appends its step timings, bytes synced and host resources to a
+# local SQLite database so slow mirrors or disks show up as a trend.
+# Run "python3 -m foreman_setup.history report" to see trends and regressions.
+
+import os
+import json
+import time
+import socket
+import shutil
+import sqlite3
+import argparse
+import threading
+import statistics
+
+from foreman_setup.common import tcolor
+
+history_db = os.path.expanduser("~/.local/share/foreman_installer/history.db")
+# Resource time series written by foreman_setup.sampler
+samples_dir = os.path.expanduser("~/.local/share/foreman_installer/samples")
+
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    script TEXT NOT NULL,
+    host TEXT,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT,
+    cpus INTEGER,
+    mem_bytes INTEGER,
+    disk_free INTEGER,
+    args TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    step TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    bytes INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS steps_step ON steps(step, started);
+"""
+
+
+def connect(dbpath=history_db):
+    os.makedirs(os.path.dirname(os.path.abspath(dbpath)), exist_ok=True)
+    db = sqlite3.connect(dbpath, check_same_thread=False)
+    db.executescript(schema)
+    return db
+
+
+def host_resources(path="."):
+    try:
+        mem = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError):
+        mem = None
+    return {"cpus": os.cpu_count(), "mem_bytes": mem,
+            "disk_free": shutil.disk_usage(path).free}
+
+
+class Run:
+    """An open history record for one script invocation."""
+
+    def __init__(self, script, args=None, dbpath=history_db):
+        self.db = connect(dbpath)
+        # Steps may be recorded from concurrent repo syncs
+        self.lock = threading.Lock()
+        res = host_resources()
+        cur = self.db.execute(
+            "INSERT INTO runs (script, host, started, cpus, mem_bytes," +
+            " disk_free, args) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (script, socket.gethostname(), time.time(), res["cpus"],
+             res["mem_bytes"], res["disk_free"],
+             json.dumps(args) if args is not None else None))
+        self.db.commit()
+        self.id = cur.lastrowid
+
+    def record(self, step, started, duration, nbytes=None, detail=None):
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO steps (run_id, step, started, duration," +
+                " bytes, detail) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.id, step, started, duration, nbytes,
+                 json.dumps(detail) if detail is not None else None))
+            self.db.commit()
+
+    def step(self, step, func, *args, path=None, detail=None):
+        # Time func(*args); when path is a directory, also record the
+        # bytes added or rewritten under it, when it is a file its size
+        before = tree_state(path) if path else None
+        started = time.time()
+        try:
+            return func(*args)
+        finally:
+            duration = time.time() - started
+            nbytes = None
+            if path and os.path.isfile(path):
+                nbytes = os.path.getsize(path)
+            elif path:
+                nbytes = changed_bytes(before, tree_state(path))
+            self.record(step, started, duration, nbytes, detail)
+
+    def finish(self, status="complete"):
+        with self.lock:
+            self.db.execute("UPDATE runs SET finished = ?, status = ?" +
+                            " WHERE id = ? AND finished IS NULL",
+                            (time.time(), status, self.id))
+            self.db.commit()
+
+
+def tree_state(path):
+    state = {}
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            fpath = os.path.join(root, name)
+            try:
+                stat = os.lstat(fpath)
+            except FileNotFoundError:
+                continue
+            state[fpath] = (stat.st_size, stat.st_mtime)
+    return state
+
+
+def changed_bytes(before, after):
+    return sum(size for fpath, (size, mtime) in after.items()
+               if before.get(fpath) != (size, mtime))
+
+
+def step_history(db, script=None):
+    query = "SELECT runs.script, steps.step, steps.started," + \
+            " steps.duration, steps.bytes FROM steps" + \
+            " JOIN runs ON runs.id = steps.run_id"
+    params = ()
+    if script:
+        query += " WHERE runs.script = ?"
+        params = (script,)
+    history = {}
+    for row in db.execute(query + " ORDER BY steps.started", params):
+        history.setdefault((row[0], row[1]), []).append(row[2:])
+    return history
+
+
+def regressions(history, window=10, factor=1.5, min_seconds=30):
+    # Compare each step's latest duration with the median of the runs
+    # before it; short steps are ignored since their noise dominates
+    flagged = []
+    for key, rows in history.items():
+        if len(rows) < 3:
+            continue
+        latest = rows[-1][1]
+        baseline = statistics.median(r[1] for r in rows[-window - 1:-1])
+        if latest >= min_seconds and 0 < baseline * factor < latest:
+            flagged.append((key, latest, baseline))
+    return flagged
+
+
+def human_time(seconds):
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.1f}s"
+
+
+def human_bytes(nbytes):
+    if nbytes is None:
+        return "-"
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if nbytes < 1024:
+            return f"{nbytes:.0f}{unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f}TiB"
+
+
+def report(dbpath=history_db, script=None, window=10, factor=1.5):
+    if not os.path.exists(dbpath):
+        print(f"{tcolor.wrn}No run history at {dbpath}{tcolor.dflt}")
+        return
+    db = connect(dbpath)
+    history = step_history(db, script)
+    print(f"{tcolor.gen}{'script':<22}{'step':<34}{'runs':>5}" +
+          f"{'last':>9}{'median':>9}{'bytes':>10}{tcolor.dflt}")
+    for (sname, step), rows in sorted(history.items()):
+        durations = [r[1] for r in rows[-window:]]
+        print(f"{sname:<22}{step:<34}{len(rows):>5}" +
+              f"{human_time(rows[-1][1]):>9}" +
+              f"{human_time(statistics.median(durations)):>9}" +
+              f"{human_bytes(rows[-1][2]):>10}")
+    print('')
+    flagged = regressions(history, window, factor)
+    if not flagged:
+        print(f"{tcolor.ok}No steps slower than {factor}x their" +
+              f" rolling baseline{tcolor.dflt}")
+    for (sname, step), latest, baseline in flagged:
+        print(f"{tcolor.wrnb}{sname} {step}: {human_time(latest)}" +
+              f" vs baseline {human_time(baseline)}" +
+              f" ({latest / baseline:.1f}x){tcolor.dflt}")
+
+
+def main():
+    arg = argparse.ArgumentParser(
+        description="Foreman run history",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg.add_argument("--db", action="store", default=history_db,
+                     help="History database")
+    sub = arg.add_subparsers(dest="command")
+    sub.required = True
+    rpt = sub.add_parser("report", help="Show step trends and regressions",
+                         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    rpt.add_argument("-s", "--script", action="store", default=None,
+                     help="Only show runs of this script")
+    rpt.add_argument("-w", "--window", action="store", type=int, default=10,
+                     help="Number of previous runs in the rolling baseline")
+    rpt.add_argument("-x", "--factor", action="store", type=float,
+                     default=1.5, help="Flag steps slower than this" +
+                     " multiple of their baseline")
+    flg = arg.parse_args()
+    if flg.command == "report":
+        report(flg.db, flg.script, flg.window, flg.factor)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,870 @@
+# Foreman server installation phases: preflight checks, package setup
+# and the foreman-installer run. Each phase is a function so repo setup and
+# install can run in the same process; nothing runs at import time.
+# Specifically targeting EL8 for repo constraints
+# Step timings are kept in the run history
+
+import os
+import json
+import site
+import socket
+import hashlib
+import argparse
+import tempfile
+import importlib
+import subprocess
+import urllib.request
+from sys import exit
+from multiprocessing import cpu_count
+
+import psutil
+
+from foreman_setup import history, repos
+from foreman_setup.sampler import Sampler, show_summary
+from foreman_setup.common import (tcolor, banner, clear_screen, platform_id,
+                                  confirm, prompt_version, enable_repo,
+                                  install_package, update_package,
+                                  configure_modules)
+from foreman_setup.config import Session
+
+compute_packs = {"vmware": "--enable-foreman-compute-vmware",
+                 "ec2": "--enable-foreman-compute-ec2",
+                 "libvirt": "--enable-foreman-compute-libvirt",
+                 "gce": "--enable-foreman-compute-gce",
+                 "openstack": "--enable-foreman-compute-openstack",
+                 "ovirt": "--enable-foreman-compute-ovirt"}
+
+
+def compute_pack(cr):
+    if cr not in compute_packs:
+        print(f"{tcolor.wrnb}Compute resource invalid!")
+        print(f"{tcolor.msg}Use foreman-installer.py -h for valid options")
+        print(f"{tcolor.wrn}Exiting!{tcolor.dflt}")
+        exit()
+    return compute_packs[cr]
+
+
+def dns_modules():
+    # dnspython is pulled in on first use; on disconnected hosts the repo
+    # setup installs it from the bundle's wheels
+    try:
+        import dns.resolver
+    except ModuleNotFoundError:
+        subprocess.run(["pip3", "install", "--user", "dnspython",
+                        "dnspython"])
+        site.addsitedir(site.getusersitepackages())
+        importlib.invalidate_caches()
+        import dns.resolver
+    import dns.reversename
+    return dns.resolver, dns.reversename
+
+
+def prefetch_packages():
+    # Resolve the update and installer as one transaction as soon as repos
+    # and modules are set, and download it in the background. The later
+    # dnf runs then install from the warm cache.
+    script = open("foreman-prefetch.dnf", "w")
+    script.write("upgrade\ninstall foreman-installer-katello\nrun\n")
+    script.close()
+    log = open("foreman-prefetch.log", "w")
+    proc = subprocess.Popen(["sudo", "dnf", "shell", "-y", "--downloadonly",
+                             "--setopt=max_parallel_downloads=10",
+                             "foreman-prefetch.dnf"],
+                            stdout=log, stderr=subprocess.STDOUT,
+                            stdin=subprocess.DEVNULL)
+    log.close()
+    return proc
+
+
+def prefetch_wait(proc):
+    if proc.poll() is None:
+        print(f"{tcolor.msg}Waiting for package prefetch to finish" +
+              f" (see foreman-prefetch.log)...{tcolor.dflt}")
+    rc = proc.wait()
+    os.remove("foreman-prefetch.dnf")
+    return rc
+
+
+def enable_fw_svc(firewall_service):
+    subprocess.run(["sudo", "firewall-cmd", "--add-service", firewall_service])
+
+
+def fw_reload():
+    subprocess.run(["sudo", "firewall-cmd", "--runtime-to-permanent"])
+
+
+def katello_install(loc, org, badmun, tunp):
+    return subprocess.run(["sudo", "foreman-installer", "--scenario",
+                           "katello", "--tuning", tunp,
+                           "--foreman-initial-location", loc,
+                           "--foreman-initial-organization", org,
+                           "--foreman-initial-admin-username",
+                           badmun]).returncode
+
+
+def katello_install_w_compute(loc, org, badmun, tunp, crpack):
+    return subprocess.run(["sudo", "foreman-installer", "--scenario",
+                           "katello", "--tuning", tunp,
+                           "--foreman-initial-location", loc,
+                           "--foreman-initial-organization", org,
+                           "--foreman-initial-admin-username", badmun,
+                           crpack]).returncode
+
+
+def katello_reconfigure(options):
+    # foreman-installer keeps its previous answers, so only changed
+    # options need to be passed
+    return subprocess.run(["sudo", "foreman-installer", "--scenario",
+                           "katello"] + options).returncode
+
+
+def resource_check(cfg):
+    # Define CPU core count and memory
+    cpuc = int(cpu_count())
+    memc = int(round(psutil.virtual_memory().total / 1024000000))
+
+    # Validate physical resources meet default tuning spec
+    if cfg.tune == str("development") and memc < 6:
+        print(f"{tcolor.flb}Host does not meet minimum resources spec" +
+              f" for the development tuning profile {tcolor.wrn}" +
+              "(1 core, 6 GB Memory)")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        print('')
+        exit()
+    if cfg.tune == str("development") or cpuc >= 4 and memc >= 20:
+        return
+    print(f"{tcolor.wrnb}Host does not meet minimum resources spec" +
+          f" for the default tuning profile {tcolor.wrn}" +
+          "(4 core, 20 GB Memory)")
+    print('')
+    print(f"{tcolor.msg}For dev deployment, we'll set tuning to " +
+          f"{tcolor.dflt}development")
+    print('')
+    if cfg.noprompt:
+        print(f"{tcolor.wrn}Assuming dev deployment...{tcolor.dflt}")
+        uans = "y"
+    else:
+        print(f"{tcolor.pmt}Is this a development " +
+              f"deployment?{tcolor.dflt}")
+        uans = confirm()
+    if uans == "y" and memc >= 6:
+        cfg.tune = "development"
+        print('')
+        print(f"{tcolor.okb}Proceeding with install!{tcolor.dflt}")
+        print('')
+    elif uans == "y":
+        print('')
+        print(f"{tcolor.flb}Host does not meet the minimum " +
+              "resources for the development tuning profile" +
+              f"{tcolor.fl} (1 core, 6 GB Memory)")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        print('')
+        exit()
+    else:
+        print('')
+        if uans == "":
+            print(f"{tcolor.fl}Invalid input. Assuming no...")
+            print('')
+        print(f"{tcolor.flb}Host does not meet resource spec!")
+        print(f"{tcolor.fl}Exiting...{tcolor.dflt}")
+        print('')
+        exit()
+
+
+# Approximate values of the stock foreman-installer tuning profiles, used
+# to pick the base profile and to compare against the derived values
+tune_profiles = [
+    {"name": "development", "cores": 1, "mem_gb": 6,
+     "puma_workers": 2, "puma_threads": 5, "shared_buffers_mb": 512,
+     "work_mem_mb": 4, "pulp_workers": 2, "candlepin_heap_mb": 1024},
+    {"name": "default", "cores": 4, "mem_gb": 20,
+     "puma_workers": 6, "puma_threads": 5, "shared_buffers_mb": 2048,
+     "work_mem_mb": 4, "pulp_workers": 4, "candlepin_heap_mb": 2048},
+    {"name": "medium", "cores": 8, "mem_gb": 32,
+     "puma_workers": 12, "puma_threads": 5, "shared_buffers_mb": 4096,
+     "work_mem_mb": 4, "pulp_workers": 8, "candlepin_heap_mb": 4096},
+    {"name": "large", "cores": 16, "mem_gb": 64,
+     "puma_workers": 24, "puma_threads": 5, "shared_buffers_mb": 16384,
+     "work_mem_mb": 8, "pulp_workers": 8, "candlepin_heap_mb": 8192},
+    {"name": "extra-large", "cores": 32, "mem_gb": 128,
+     "puma_workers": 48, "puma_threads": 5, "shared_buffers_mb": 32768,
+     "work_mem_mb": 8, "pulp_workers": 16, "candlepin_heap_mb": 8192},
+    {"name": "extra-extra-large", "cores": 48, "mem_gb": 256,
+     "puma_workers": 64, "puma_threads": 5, "shared_buffers_mb": 65536,
+     "work_mem_mb": 16, "pulp_workers": 16, "candlepin_heap_mb": 12288},
+]
+custom_hiera = "/etc/foreman-installer/custom-hiera.yaml"
+hiera_begin = "# BEGIN foreman_installer.py auto tuning"
+hiera_end = "# END foreman_installer.py auto tuning"
+
+
+def disk_rotational(path):
+    # Walk up to the block device backing path and read its queue type
+    try:
+        dev = os.stat(path).st_dev
+        sysdir = os.path.realpath("/sys/dev/block/%d:%d" %
+                                  (os.major(dev), os.minor(dev)))
+        for qdir in [sysdir, os.path.dirname(sysdir)]:
+            qfile = os.path.join(qdir, "queue", "rotational")
+            if os.path.exists(qfile):
+                with open(qfile) as file:
+                    return file.read().strip() == "1"
+    except (OSError, ValueError):
+        pass
+    return False
+
+
+def nearest_profile(cores, mem_gb):
+    # Largest stock profile whose minimum spec the host meets
+    chosen = tune_profiles[0]
+    for prof in tune_profiles:
+        if cores >= prof["cores"] and mem_gb >= prof["mem_gb"]:
+            chosen = prof
+    return chosen
+
+
+def auto_tuning():
+    cores = int(cpu_count())
+    mem_gb = int(round(psutil.virtual_memory().total / 1024000000))
+    datadir = "/var/lib" if os.path.isdir("/var/lib") else "/"
+    disk_gb = int(psutil.disk_usage(datadir).free / 1024000000)
+    hdd = disk_rotational(datadir)
+    mem_mb = mem_gb * 1024
+
+    # Puma workers take ~1 GB each; keep a quarter of memory for them and
+    # the rest for PostgreSQL, Candlepin, Pulp and the OS
+    workers = max(2, min(int(cores * 1.5), int(mem_gb / 4)))
+    threads = 5 if cores < 16 else 8
+    shared_buffers = min(max(512, int(mem_mb / 8)), 65536)
+    work_mem = min(max(4, int(mem_mb / 4 / (workers * threads * 4))), 64)
+    pulp_workers = max(2, min(cores, int(mem_gb / 4), 16))
+    heap = min(max(1024, int(mem_mb / 16)), 12288)
+    return {"name": "auto", "cores": cores, "mem_gb": mem_gb,
+            "disk_gb": disk_gb, "hdd": hdd,
+            "puma_workers": workers, "puma_threads": threads,
+            "shared_buffers_mb": shared_buffers, "work_mem_mb": work_mem,
+            "effective_cache_size_mb": int(mem_mb / 2),
+            "random_page_cost": 4 if hdd else 1.1,
+            "effective_io_concurrency": 2 if hdd else 200,
+            "pulp_workers": pulp_workers, "candlepin_heap_mb": heap,
+            "base": nearest_profile(cores, mem_gb)["name"]}
+
+
+def show_tuning(tune):
+    base = nearest_profile(tune["cores"], tune["mem_gb"])
+    print(f"{tcolor.msg}Host: {tune['cores']} cores, {tune['mem_gb']} GB" +
+          f" memory, {tune['disk_gb']} GB free on" +
+          f" {'HDD' if tune['hdd'] else 'SSD'}{tcolor.dflt}")
+    print('')
+    print(f"{tcolor.gen}{'setting':<22}{'auto':>10}" +
+          f"{base['name']:>20}{tcolor.dflt}")
+    for key in ["puma_workers", "puma_threads", "shared_buffers_mb",
+                "work_mem_mb", "pulp_workers", "candlepin_heap_mb"]:
+        mark = tcolor.wrn if tune[key] != base[key] else tcolor.dflt
+        print(f"{key:<22}{mark}{tune[key]:>10}{tcolor.dflt}" +
+              f"{base[key]:>20}")
+    print('')
+
+
+def tuning_hiera(tune, lookup=True):
+    lines = [hiera_begin]
+    if lookup:
+        # Merge our postgres settings into the installer's own entries
+        # rather than replacing the whole hash
+        lines += ["lookup_options:",
+                  "  postgresql::server::config_entries:",
+                  "    merge: deep"]
+    lines += ["foreman::foreman_service_puma_workers: %d" %
+              tune["puma_workers"],
+              "foreman::foreman_service_puma_threads_min: %d" %
+              tune["puma_threads"],
+              "foreman::foreman_service_puma_threads_max: %d" %
+              tune["puma_threads"],
+              "foreman_proxy_content::pulpcore_worker_count: %d" %
+              tune["pulp_workers"],
+              "candlepin::java_opts: \"-Xms1024m -Xmx%dm\"" %
+              tune["candlepin_heap_mb"],
+              "postgresql::server::config_entries:",
+              "  shared_buffers: %dMB" % tune["shared_buffers_mb"],
+              "  work_mem: %dMB" % tune["work_mem_mb"],
+              "  effective_cache_size: %dMB" %
+              tune["effective_cache_size_mb"],
+              "  random_page_cost: %s" % tune["random_page_cost"],
+              "  effective_io_concurrency: %d" %
+              tune["effective_io_concurrency"],
+              hiera_end]
+    return "\n".join(lines) + "\n"
+
+
+def write_tuning(tune):
+    # Replace our managed block in custom-hiera.yaml, keeping anything the
+    # admin added around it; a backup of the previous file is kept.
+    # Without auto tuning a block left by an earlier run is removed.
+    cur = subprocess.run(["sudo", "cat", custom_hiera],
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                         universal_newlines=True).stdout
+    keep = []
+    skip = False
+    found = False
+    for line in cur.splitlines():
+        if line.strip() == hiera_begin:
+            skip = True
+            found = True
+        elif line.strip() == hiera_end:
+            skip = False
+        elif not skip:
+            keep.append(line)
+    if tune is None and not found:
+        return False
+    text = "\n".join(keep).rstrip("\n")
+    if tune is not None:
+        # Only one lookup_options key may exist in the file
+        lookup = not any(line.startswith("lookup_options:")
+                         for line in keep)
+        if not lookup:
+            print(f"{tcolor.wrn}{custom_hiera} already has lookup_options," +
+                  " add a deep merge for postgresql::server::config_entries" +
+                  " there to keep the installer's postgres" +
+                  f" settings{tcolor.dflt}")
+        text = (text + "\n" if text else "") + tuning_hiera(tune, lookup)
+    else:
+        text = text + "\n" if text else ""
+    file = open("custom-hiera.yaml", "w")
+    file.write(text)
+    file.close()
+    os.system("sudo cp -p " + custom_hiera + " " + custom_hiera + ".bak")
+    os.system("sudo cp custom-hiera.yaml " + custom_hiera +
+              "; rm -f custom-hiera.yaml")
+    if tune is None:
+        print(f"{tcolor.ok}Auto tuning from an earlier run removed from" +
+              f" {custom_hiera}{tcolor.dflt}")
+    else:
+        print(f"{tcolor.ok}Auto tuning written to" +
+              f" {custom_hiera}{tcolor.dflt}")
+    return True
+
+
+# Fingerprint of the last successful foreman-installer run
+install_state = os.path.expanduser(
+    "~/.local/share/foreman_installer/install_state.json")
+
+
+def install_params(cfg, autotune=None):
+    # Effective foreman-installer parameters for this run, keyed by the
+    # option they are passed as
+    params = {"--tuning": cfg.tune,
+              "--foreman-initial-location": cfg.loc,
+              "--foreman-initial-organization": cfg.org,
+              "--foreman-initial-admin-username": cfg.username}
+    if cfg.compute_resource:
+        params[compute_pack(cfg.compute_resource)] = ""
+    if autotune:
+        params["custom-hiera"] = hashlib.sha256(
+            tuning_hiera(autotune).encode()).hexdigest()
+    return params
+
+
+def package_versions():
+    out = subprocess.run(["rpm", "-qa", "--qf",
+                          "%{NAME}-%{VERSION}-%{RELEASE}.%{ARCH}\n",
+                          "foreman*", "katello*", "rubygem-foreman*",
+                          "rubygem-katello*", "puppet*", "pulpcore*",
+                          "python*-pulp*", "candlepin*"],
+                         stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout
+    return hashlib.sha256(
+        "\n".join(sorted(out.split())).encode()).hexdigest()
+
+
+def load_install_state():
+    try:
+        with open(install_state) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_install_state(params, packages):
+    os.makedirs(os.path.dirname(install_state), exist_ok=True)
+    file = open(install_state, "w")
+    json.dump({"params": params, "packages": packages}, file, indent=2)
+    file.close()
+
+
+def install_plan(params, packages, force=False):
+    # Returns None to skip foreman-installer, [] for a full run, or the
+    # options to pass for a narrowed run
+    state = load_install_state()
+    if force or state is None or \
+            state["packages"] != packages:
+        return []
+    changed = [key for key in params
+               if state["params"].get(key) != params[key]]
+    # A dropped option or tuning block cannot be passed as a change
+    if any(key not in params for key in state["params"]):
+        return []
+    if len(changed) == 0:
+        return None
+    options = []
+    for key in changed:
+        if key == "custom-hiera":
+            continue
+        options.append(key)
+        if len(params[key]) > 0:
+            options.append(params[key])
+    return options
+
+
+def active_tuning(cfg, autotune=None):
+    # Values in effect for this run, to compare sampled peaks against
+    if autotune:
+        return autotune
+    return next((p for p in tune_profiles if p["name"] == cfg.tune), None)
+
+
+def sampled(cfg, session, autotune, step, func, *args):
+    # Time a step, and sample resource use while it runs
+    if cfg.sample_interval <= 0:
+        return session.timed(step, func, *args)
+    sampler = Sampler(cfg.sample_interval, cfg.samples, step,
+                      active_tuning(cfg, autotune))
+    with sampler:
+        result = session.timed(step, func, *args)
+    show_summary(sampler.result, sampler.summarypath)
+    return result
+
+
+def print_manual_steps(cfg):
+    print(f"{tcolor.wrn}Host is setup for Foreman installation" +
+          f" but foreman has {tcolor.fl}NOT{tcolor.wrn} been installed.")
+    print('')
+    print(f"{tcolor.msg}Execute the following to complete installation:")
+    print(f"{tcolor.dflt}firewall-cmd " +
+          "--add-service={foreman,foreman-proxy}")
+    print("firewall-cmd --runtime-to-permanent")
+    print("foreman-installer --scenario katello \\")
+    print(f" --foreman-initial-location={cfg.loc} \\")
+    print(f" --foreman-initial-organization={cfg.org} \\")
+    if cfg.compute_resource:
+        print(f" --foreman-initial-admin-username={cfg.username} \\")
+        print(f" {compute_pack(cfg.compute_resource)}")
+    else:
+        print(f" --foreman-initial-admin-username={cfg.username}")
+    print(f'{tcolor.dflt}')
+
+
+def prompt_missing(cfg):
+    # Define paramaters for Foreman installation
+    if len(cfg.org) == 0:
+        cfg.org = input(tcolor.pmt + "Organization: " + tcolor.dflt)
+    if len(cfg.loc) == 0:
+        cfg.loc = input(tcolor.pmt + "Location: " + tcolor.dflt)
+    if len(cfg.username) == 0:
+        cfg.username = input(tcolor.pmt + "Admin username: " + tcolor.dflt)
+    print('')
+
+
+def confirm_install(cfg):
+    # Ask before the package installs, so the rest of the run needs no
+    # answers while packages download and install
+    if cfg.noprompt:
+        return True
+    print(f"{tcolor.pmt}Proceed with the Foreman installation once the" +
+          f" packages are installed?{tcolor.dflt}")
+    uans = confirm()
+    print('')
+    if uans == "":
+        print(f"{tcolor.fl}Invalid input. Assuming no...")
+    return uans == "y"
+
+
+def proceed(cfg, session, autotune, install):
+    print(f"{tcolor.msg}Host is ready for Foreman Installation.")
+    if install:
+        foreman_install(cfg, session, autotune)
+        return
+    print_manual_steps(cfg)
+
+
+def foreman_install(cfg, session, autotune=None):
+    print(f"{tcolor.okb}Proceeding with Foreman Installation!{tcolor.dflt}")
+    print('')
+
+    print(f"{tcolor.msg}Opening firewall for required services{tcolor.dflt}")
+    enable_fw_svc("foreman")
+    enable_fw_svc("foreman-proxy")
+    fw_reload()
+    print('')
+
+    if write_tuning(autotune):
+        print('')
+    # Skip or narrow the installer run when the parameters and installed
+    # packages match the last successful run
+    params = install_params(cfg, autotune)
+    packages = package_versions()
+    plan = install_plan(params, packages, cfg.force_install)
+    if plan is None:
+        print(f"{tcolor.okb}Parameters and packages are unchanged since the" +
+              " last successful run, skipping foreman-installer")
+        print(f"{tcolor.msg}Use --force-install to run it anyway{tcolor.dflt}")
+        print('')
+        session.finish("skipped")
+        return
+    if len(plan) > 0:
+        print(f"{tcolor.msg}Reconfiguring changed parameters:{tcolor.dflt} " +
+              " ".join(plan))
+        print('')
+        rc = sampled(cfg, session, autotune, "katello_reconfigure",
+                     katello_reconfigure, plan)
+    elif cfg.compute_resource:
+        print(f"{tcolor.msg}Installing Foreman and Katello" +
+              f" services{tcolor.dflt}")
+        print('')
+        rc = sampled(cfg, session, autotune, "katello_install",
+                     katello_install_w_compute, cfg.loc, cfg.org,
+                     cfg.username, cfg.tune,
+                     compute_pack(cfg.compute_resource))
+    else:
+        print(f"{tcolor.msg}Installing Foreman and Katello" +
+              f" services{tcolor.dflt}")
+        print('')
+        rc = sampled(cfg, session, autotune, "katello_install",
+                     katello_install, cfg.loc, cfg.org, cfg.username,
+                     cfg.tune)
+    # foreman-installer exits 2 when it applied changes successfully. The
+    # installer pulls in packages itself, so the state records the
+    # packages it left behind
+    if rc in (0, 2):
+        save_install_state(params, package_versions())
+    session.finish()
+    print(f"{tcolor.okb}Foreman installation complete!{tcolor.dflt}")
+    log = "/var/log/foreman-installer/katello.log"
+    print(f"{tcolor.gen}See the following location for details:{tcolor.dflt}")
+    print('')
+    print("-" * len(log + str("|  |")))
+    print(f"| {log} |")
+    print("-" * len(log + str("|  |")))
+    print('')
+
+
+def require_version(cfg, product):
+    # Returns the version given on the command line, or prompts for it
+    version = getattr(cfg, product.lower())
+    if len(version) > 0:
+        return version
+    if cfg.noprompt:
+        print(f"{tcolor.flb}Unable to get {product} verison interactively!")
+        print(f"{tcolor.fl}Define {product} argument, or allow prompting")
+        print(f"{tcolor.msg}Use -h or --help for assistance{tcolor.dflt}")
+        print('')
+        exit()
+    return prompt_version(product)
+
+
+def mirror_manifest(mirror):
+    # bundle.json of a builder's repos, from a local path or a URL
+    try:
+        if "://" in mirror:
+            with urllib.request.urlopen(mirror + "/" + repos.manifest,
+                                        timeout=30) as resp:
+                return json.loads(resp.read().decode())
+        with open(os.path.join(mirror, repos.manifest)) as file:
+            return json.load(file)
+    except (OSError, ValueError) as err:
+        print(f"{tcolor.flb}Unable to read {repos.manifest} from the" +
+              f" mirror!{tcolor.dflt}")
+        print(f"{tcolor.msg}{err}")
+        print(f"{tcolor.msg}--mirror takes the builder's {repos.repodir}" +
+              f" directory, as a path or URL{tcolor.dflt}")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+
+
+def configure_mirror(cfg):
+    # Point every repo at the builder's mirror instead of upstream, after
+    # checking it carries the requested versions
+    mirror = cfg.mirror.rstrip("/")
+    if "://" not in mirror:
+        # dnf resolves file:// URLs from /, not the working directory
+        mirror = os.path.abspath(mirror)
+    data = mirror_manifest(mirror)
+    profile = data.get("profile", "server")
+    if profile != "server":
+        print(f"{tcolor.flb}The mirror is a {profile} bundle, which cannot" +
+              " install a Foreman server!")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    vset = repos.select_version_set(data, cfg.foreman, cfg.katello,
+                                    cfg.noprompt)
+    print(f"{tcolor.msg}Using Foreman {vset['foreman']} / Katello" +
+          f" {vset['katello']} from {tcolor.dflt}{mirror}")
+    with tempfile.TemporaryDirectory() as tmp:
+        repos.write_repo_files(vset, basedir=mirror, dest=tmp)
+        repos.replace_repo_files(tmp)
+    return vset
+
+
+def connected_install(cfg, session, autotune=None):
+    # Define Foreman and Katello versions
+    cfg.foreman = require_version(cfg, "Foreman")
+    cfg.katello = require_version(cfg, "Katello")
+
+    # Setup/install repositories required for installation
+    print('')
+    print(f"{tcolor.msg}Configuring repositories...{tcolor.dflt}")
+    print('')
+    if len(cfg.mirror) > 0:
+        configure_mirror(cfg)
+    else:
+        install_package("https://yum.theforeman.org/releases/" +
+                        cfg.foreman + "/el8/x86_64/foreman-release.rpm")
+        install_package("https://yum.theforeman.org/katello/" +
+                        cfg.katello +
+                        "/katello/el8/x86_64/katello-repos-latest.rpm")
+        install_package("https://yum.puppet.com/" +
+                        "puppet7-release-el-8.noarch.rpm")
+        enable_repo("appstream")
+        enable_repo("baseos")
+    print(f"{tcolor.ok}Repositories configured!{tcolor.dflt}")
+    print('')
+
+    print(f"{tcolor.msg}Configuring DNF Modules...{tcolor.dflt}")
+    configure_modules()
+    print(f"{tcolor.ok}DNF Modules configured!{tcolor.dflt}")
+    print('')
+
+    # Download packages in the background while parameters are collected
+    prefetch = None
+    if cfg.prefetch:
+        print(f"{tcolor.msg}Prefetching packages in the" +
+              f" background...{tcolor.dflt}")
+        prefetch = prefetch_packages()
+        print('')
+
+    # Everything that needs an answer runs while the prefetch downloads
+    dns_check(cfg)
+    prompt_missing(cfg)
+    install = confirm_install(cfg)
+
+    # Install required packages
+    if prefetch:
+        session.timed("prefetch_wait", prefetch_wait, prefetch)
+    print(f"{tcolor.msg}Installing packages...{tcolor.dflt}")
+    sampled(cfg, session, autotune, "update_package", update_package)
+    sampled(cfg, session, autotune,
+            "install_package:foreman-installer-katello", install_package,
+            "foreman-installer-katello")
+    print(f"{tcolor.ok}Package installation complete!{tcolor.dflt}")
+    print('')
+
+    # Part of package installation is to do a full system update
+    # User should reboot host if kernel was updated
+    print(f"{tcolor.msg}Run {tcolor.dflt}rpm -qa kernel --last{tcolor.msg}" +
+          f" to see if a reboot is needed.{tcolor.dflt}")
+    print('')
+
+    proceed(cfg, session, autotune, install)
+
+
+def disconnected_install(cfg, session, autotune=None):
+    # A proxy bundle lacks Candlepin and the server packages
+    profile = repos.bundle_profile()
+    if profile != "server":
+        print(f"{tcolor.flb}The offline repos are a {profile} bundle," +
+              " which cannot install a Foreman server!")
+        print(f"{tcolor.msg}Build a bundle with" +
+              f" {tcolor.dflt}foreman_repo_builder.py -c --profile server")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+
+    # Ask everything up front, so the installs run unattended
+    dns_check(cfg)
+    prompt_missing(cfg)
+    install = confirm_install(cfg)
+
+    # Install required packages
+    print(f"{tcolor.msg}Installing packages...{tcolor.dflt}")
+    sampled(cfg, session, autotune, "update_package", update_package)
+    configure_modules(profile)
+    sampled(cfg, session, autotune,
+            "install_package:foreman-installer-katello", install_package,
+            "foreman-installer-katello")
+    print(f"{tcolor.ok}Package installation complete!{tcolor.dflt}")
+    print('')
+
+    # Part of package installation is to do a full system update
+    # User should reboot host if kernel was updated
+    print(f"{tcolor.msg}Run {tcolor.dflt}rpm -qa kernel --last{tcolor.msg}" +
+          f" to see if a reboot is needed.{tcolor.dflt}")
+    print('')
+
+    proceed(cfg, session, autotune, install)
+
+
+def continue_anyway(cfg, message):
+    # Returns when the user accepts the risk, exits otherwise
+    if cfg.noprompt:
+        print(f"{tcolor.wrn}{message}{tcolor.dflt}")
+        print('')
+        return
+    print(f"{tcolor.pmt}Do you wish to proceed?{tcolor.dflt}")
+    uans = confirm()
+    print('')
+    if uans == "y":
+        print(f"{tcolor.wrn}{message}{tcolor.dflt}")
+        print('')
+        return
+    if uans == "":
+        print(f"{tcolor.fl}Invalid input. Assuming no...")
+    print(f"{tcolor.flb}Exiting...{tcolor.dflt}")
+    exit()
+
+
+def check_record(cfg, resolver, name, rtype, hname, ipaddr):
+    # Warn with the hosts file entry to add when a record is missing
+    try:
+        resolver.query(name, rtype)
+        return
+    except resolver.NXDOMAIN:
+        pass
+    kind = "Reverse DNS" if rtype == "PTR" else "DNS"
+    print('')
+    print(f"{tcolor.flb}{kind} lookup failed!{tcolor.dflt}")
+    print(f"{tcolor.msg}Ensure hosts file has" +
+          f" the following entry or install will fail:{tcolor.dflt}")
+    print('')
+    print("-" * len(hname + str('    ') + str('|  |') + ipaddr))
+    print(f"| {ipaddr}    {hname} |")
+    print("-" * len(ipaddr + str('    ') + str('|  |') + hname))
+    print('')
+    print(f"{tcolor.wrn}Submit {rtype} record in DNS" +
+          " server or configure hosts file with above entry")
+    print('')
+    continue_anyway(cfg, "Proceeding with install!")
+
+
+def preflight(cfg):
+    # Derive custom tuning from host resources, based on the nearest profile
+    autotune = None
+    if cfg.tune == str("auto") or cfg.tune_dry_run:
+        autotune = auto_tuning()
+        show_tuning(autotune)
+        if cfg.tune_dry_run:
+            exit()
+        cfg.tune = autotune["base"]
+        print(f"{tcolor.msg}Using {tcolor.dflt}{cfg.tune}{tcolor.msg} as the" +
+              f" base tuning profile with auto tuned values{tcolor.dflt}")
+        print('')
+
+    # Check platform ID to ensure it's EL8
+    platform_id()
+
+    # Check host resources
+    resource_check(cfg)
+    if cfg.compute_resource:
+        compute_pack(cfg.compute_resource)
+
+    # Check if session is "screen"ed or "tmux"ed
+    # If not, prompt user to continue at own risk
+    if os.environ.get('TERM') != str("screen"):
+        print(f"{tcolor.wrnb}Session does not appear to be running in" +
+              " asynchronous method (i.e screen or tmux)")
+        print(f"{tcolor.msg}Foreman installation can be time consuming")
+        print("It may not finish before remote session reaches idle timeout.")
+        print('')
+        continue_anyway(cfg, "Proceeding without screen/tmux")
+    return autotune
+
+
+def dns_check(cfg):
+    # Validate DNS records for host (required for install)
+    resolver, reversename = dns_modules()
+    hname = socket.gethostname()
+    ipaddr = socket.gethostbyname(hname)
+    check_record(cfg, resolver, hname, 'A', hname, ipaddr)
+    check_record(cfg, resolver, reversename.from_address(ipaddr), 'PTR',
+                 hname, ipaddr)
+
+
+def build_parser():
+    arg = argparse.ArgumentParser(
+        description="Foreman installer script",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg.add_argument("-a", "--noprompt", action="store_true",
+                     help="Do not prompt to continue/on non-critical errors")
+    arg.add_argument("-d", "--disconnected", action="store_true",
+                     help="Disconnected mode")
+    arg.add_argument("-f", "--foreman", action="store",
+                     help="Foreman version", default="")
+    arg.add_argument("-k", "--katello", action="store",
+                     help="Katello version", default="")
+    arg.add_argument("-l", "--loc", action="store", help="Location",
+                     default="Default_Location")
+    arg.add_argument("-o", "--org", action="store",
+                     help="Organization", default="Default_Organization")
+    arg.add_argument("-t", "--tune", action="store",
+                     help="Tuning profile. Acceptable options include:" +
+                     " development, default, medium, large," +
+                     " extra-large, extra-extra-large, or auto to derive" +
+                     " custom tuning from the host's cores, memory and disk",
+                     default="default")
+    arg.add_argument("--tune-dry-run", dest="tune_dry_run",
+                     action="store_true",
+                     help="Show the auto tuning values next to the nearest" +
+                     " stock profile and exit")
+    arg.add_argument("-u", "--username", action="store",
+                     help="Admin username", default="admin")
+
+    arg.add_argument("-c", "--compute-resource", dest="compute_resource",
+                     action="store", default='',
+                     help="Compute Resource type; Acceptable options" +
+                     " include: vmware, ec2, gce, openstack, ovirt," +
+                     " and libvirt ")
+    arg.add_argument("--force-install", dest="force_install",
+                     action="store_true",
+                     help="Run the full foreman-installer even when nothing" +
+                     " changed since the last successful run")
+    arg.add_argument("--no-prefetch", dest="prefetch", action="store_false",
+                     help="Do not download packages in the background" +
+                     " while the connected install prompts for parameters")
+    arg.add_argument("--mirror", action="store", default="",
+                     help="Connected install from a foreman_repo_builder.py" +
+                     " mirror instead of upstream: path or URL of its" +
+                     " foreman-repos directory, which must carry the -f/-k" +
+                     " versions")
+    arg.add_argument("--setup-repos", dest="setup_repos",
+                     action="store_true",
+                     help="With -d, unpack the offline bundle and activate" +
+                     " the -f/-k version set before installing, in the" +
+                     " same run")
+    arg.add_argument("--sample-interval", dest="sample_interval",
+                     action="store", type=float, default=5,
+                     help="Seconds between resource samples during package" +
+                     " installs and foreman-installer, 0 to disable")
+    arg.add_argument("--samples", action="store", default=history.samples_dir,
+                     help="Directory for the resource time series and" +
+                     " peak summaries")
+    arg.add_argument("--history", action="store", default=history.history_db,
+                     help="Run history database, empty to disable")
+    return arg
+
+
+def main(cfg, session=None):
+    if session is None:
+        session = Session("foreman_installer", vars(cfg), cfg.history)
+
+    clear_screen()
+
+    # Script init banner
+    banner("# Foreman Installation Script #")
+
+    autotune = preflight(cfg)
+
+    if cfg.disconnected:
+        print(f"{tcolor.msg}Starting disconnected install of" +
+              f" Foreman...{tcolor.dflt}")
+        disconnected_install(cfg, session, autotune)
+    else:
+        print(f"{tcolor.msg}Starting connected install of" +
+              f" Foreman...{tcolor.dflt}")
+        connected_install(cfg, session, autotune)
@@ -0,0 +1,48 @@
+# Runs disconnected repo setup and the Foreman install in one process.
+# Both phases share one session, so the run history has a single record and
+# the install uses the version set the repo setup activated.
+
+from sys import exit
+
+from foreman_setup import install, repos
+from foreman_setup.common import tcolor, banner, clear_screen
+from foreman_setup.config import RepoConfig, Session
+
+
+def repo_config(install_cfg):
+    # Repo setup options implied by the install options
+    return RepoConfig(offline=True, noprompt=install_cfg.noprompt,
+                      foreman=install_cfg.foreman,
+                      katello=install_cfg.katello,
+                      history=install_cfg.history)
+
+
+def run(install_cfg, repo_cfg=None):
+    if not install_cfg.disconnected:
+        print(f"{tcolor.flb}--setup-repos needs a disconnected install (-d)")
+        print(f"{tcolor.msg}Use -h or --help for assistance")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    if repo_cfg is None:
+        repo_cfg = repo_config(install_cfg)
+    session = Session("foreman_setup", {"install": vars(install_cfg),
+                                        "repos": vars(repo_cfg)},
+                      install_cfg.history)
+
+    clear_screen()
+    banner("# Foreman Setup Script #")
+
+    autotune = install.preflight(install_cfg)
+
+    # dnspython comes from the bundle's wheels, so the install's DNS checks
+    # run once the repos are set up
+    repos.disconnected_setup(repo_cfg, session)
+    vset = session.version_set
+    if not vset.get("legacy"):
+        install_cfg.foreman = vset["foreman"]
+        install_cfg.katello = vset["katello"]
+    print('')
+
+    print(f"{tcolor.msg}Starting disconnected install of" +
+          f" {repos.vset_label(vset)}...{tcolor.dflt}")
+    install.disconnected_install(install_cfg, session, autotune)
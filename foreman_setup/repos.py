@@ -0,0 +1,1335 @@
+# Offline repo bundles: syncing and packaging them on a connected host,
+# and activating them on a disconnected host. Each phase is a function so
+# the installer can run repo setup in the same process.
+
+import io
+import os
+import re
+import json
+import time
+import shutil
+import glob
+import gzip
+import lzma
+import fnmatch
+import tarfile
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from sys import exit
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from foreman_setup import history, throttle
+from foreman_setup.common import (tcolor, banner, platform_id, prompt_version,
+                                  enable_repo, install_package,
+                                  configure_modules)
+from foreman_setup.config import Session
+
+repodir = str("foreman-repos")
+offlinedir = "/var/lib/" + repodir
+# Staged releases; offlinedir is a symlink to the active one
+stagedir = offlinedir + ".d"
+# Version sets live under versions/<foreman>-<katello> inside the bundle
+versionsdir = str("versions")
+manifest = str("bundle.json")
+# Pre-built dnf metadata and solv caches for the offline repo paths
+cachedir = str("dnf-cache")
+# Member index, written next to the tarball and as its last member
+tarindex = str("tarindex.json")
+# Changes carried by a daemon delta bundle
+deltafile = str("delta.json")
+
+# Repos shared by every version set in a bundle
+shared_repos = ["appstream", "baseos"]
+# Repos synced once per Foreman/Katello version set
+version_repos = ["foreman-plugins", "foreman", "katello",
+                 "katello-candlepin", "pulpcore", "puppet7"]
+# What each bundle profile mirrors. A profile with packages mirrors only
+# their dependency closure instead of whole repos; repos that end up with
+# no packages are left out of the bundle.
+bundle_profiles = {
+    "server": {"repos": version_repos, "packages": None},
+    "proxy": {"repos": version_repos,
+              "packages": ["foreman-proxy-content",
+                           "foreman-installer-katello"]},
+}
+# Repo files written for the disconnected host
+repo_files = ["alma.repo", "foreman.repo", "foreman-plugins.repo",
+              "katello.repo", "puppet.repo"]
+
+
+def install_repo(repo_name):
+    subprocess.run(["sudo", "dnf", "install", "-y", repo_name])
+
+
+def swap_release(release_rpm):
+    # Replace the installed release package whether the target is newer
+    # or older, so each version set can be synced in turn
+    subprocess.run(["sudo", "rpm", "-Uvh", "--force", "--oldpackage",
+                    release_rpm])
+
+
+def setup_shaping(cfg, session):
+    # Shape repo syncs when a bandwidth cap or sync windows are requested
+    try:
+        if len(cfg.bwlimit) > 0:
+            session.shaper = throttle.Shaper(throttle.parse_rate(cfg.bwlimit))
+        session.windows = [throttle.parse_window(w) for w in cfg.window]
+    except ValueError:
+        print(f"{tcolor.flb}Invalid --bwlimit or --window value!")
+        print(f"{tcolor.msg}Use e.g. --bwlimit 20M --window 19:00-07:00")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+
+
+def sync_repos(repo_name, dest=repodir, shaper=None, windows=()):
+    run_shaped(["reposync", "--delete", "--download-metadata", "-p",
+                dest, "-n", "--repo", repo_name], repo_name, shaper, windows)
+
+
+def run_shaped(cmd, repo_name, shaper=None, windows=()):
+    # Run a download through the shared bandwidth cap and sync windows
+    if shaper is None and len(windows) == 0:
+        subprocess.run(cmd)
+        return
+
+    def notify(text):
+        print(f"{tcolor.wrn}{repo_name}: {text}{tcolor.dflt}")
+
+    if shaper is None:
+        throttle.run_windowed(cmd, windows, notify=notify)
+        return
+    with shaper.session(repo_name) as proxy:
+        throttle.run_windowed(cmd + ["--setopt=proxy=" + proxy],
+                              windows, notify=notify)
+
+
+def sync_all(cfg, session, repos, dest=repodir):
+    # Shaped syncs run concurrently, each with an even share of --bwlimit
+    shaped = session.shaper or len(session.windows) > 0
+    jobs = cfg.jobs if shaped else 1
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for result in [pool.submit(session.timed, "sync_repos:" + repo,
+                                   sync_repos, repo, dest, session.shaper,
+                                   session.windows,
+                                   path=os.path.join(dest, repo))
+                       for repo in repos]:
+            result.result()
+
+
+def version_set_name(fver, kver):
+    return str(fver) + "-" + str(kver)
+
+
+def version_sets(fvers, kvers):
+    # Pair comma separated Foreman and Katello versions in order
+    fvers = [v.strip() for v in str(fvers).split(",") if v.strip()]
+    kvers = [v.strip() for v in str(kvers).split(",") if v.strip()]
+    if len(fvers) != len(kvers):
+        print(f"{tcolor.flb}Foreman and Katello version counts differ!")
+        print(f"{tcolor.msg}Pass one Katello version per Foreman version")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    return list(zip(fvers, kvers))
+
+
+def load_manifest(basedir):
+    try:
+        with open(os.path.join(basedir, manifest)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"version_sets": []}
+
+
+def save_manifest(basedir, data):
+    with open(os.path.join(basedir, manifest), "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def add_version_set(data, fver, kver, repos=version_repos):
+    name = version_set_name(fver, kver)
+    data["version_sets"] = [v for v in data["version_sets"]
+                            if v["name"] != name]
+    data["version_sets"].append({"name": name, "foreman": str(fver),
+                                 "katello": str(kver),
+                                 "path": versionsdir + "/" + name,
+                                 "repos": list(repos),
+                                 "gpgkey": "RPM-GPG-KEY-foreman"})
+
+
+def release_manifest(basedir):
+    # Bundles built before bundle.json carry one version set, with its
+    # repos at the top level next to AppStream and BaseOS
+    data = load_manifest(basedir)
+    if not os.path.exists(os.path.join(basedir, manifest)) and \
+            os.path.isdir(os.path.join(basedir, "foreman")):
+        data["version_sets"] = [{"name": "unversioned", "foreman": "",
+                                 "katello": "", "path": ".",
+                                 "legacy": True}]
+    return data
+
+
+def vset_label(vset):
+    if vset.get("legacy"):
+        return "the bundle's only version set (built without " + \
+            manifest + ")"
+    return "Foreman " + vset["foreman"] + " / Katello " + vset["katello"]
+
+
+def bundle_profile(basedir=offlinedir):
+    # Bundles from before profiles are server bundles
+    return load_manifest(basedir).get("profile", "server")
+
+
+def vset_repos(vset):
+    # Bundles from before profiles carry every version repo
+    return vset.get("repos", version_repos)
+
+
+def fetch_foreman_key(dest):
+    # Each Foreman release signs with its own key, installed by the
+    # foreman-release package swapped in for the set being synced
+    os.system("sudo cp /etc/pki/rpm-gpg/RPM-GPG-KEY-foreman " + dest + "/")
+
+
+def fetch_pulp_key(dest):
+    os.system("cd " + dest +
+              "; pulpkey=$(grep -m 1 'GPG-RPM-KEY-pulpcore'" +
+              " /etc/yum.repos.d/katello.repo|awk -F '=' '{print $2}')" +
+              "; wget -N $pulpkey")
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1048576), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def dedupe_packages():
+    # Hardlink identical RPMs across version sets; tar stores hardlinked
+    # files once, so packages shared between versions ship only once
+    seen = {}
+    linked = 0
+    saved = 0
+    for root, dirs, files in os.walk(repodir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".rpm"):
+                continue
+            path = os.path.join(root, name)
+            stat = os.lstat(path)
+            key = (name, stat.st_size)
+            if key not in seen:
+                seen[key] = [path]
+                continue
+            for orig in seen[key]:
+                ostat = os.lstat(orig)
+                if ostat.st_ino == stat.st_ino:
+                    break
+                if file_digest(orig) == file_digest(path):
+                    os.remove(path)
+                    os.link(orig, path)
+                    linked += 1
+                    saved += stat.st_size
+                    break
+            else:
+                seen[key].append(path)
+    return linked, saved
+
+
+def package_closure(packages, repos):
+    # The packages and everything they require, as {repo: [nevra]},
+    # resolved against the enabled repos and module streams
+    qf = "%{repoid} %{name}-%{epoch}:%{version}-%{release}.%{arch}"
+    query = ["sudo", "dnf", "repoquery", "-q", "--latest-limit", "1",
+             "--arch", "x86_64,noarch", "--qf", qf]
+    out = ""
+    for extra in [[], ["--requires", "--resolve", "--recursive"]]:
+        out += subprocess.run(query + extra + packages,
+                              stdout=subprocess.PIPE,
+                              universal_newlines=True).stdout
+    closure = {}
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) == 2 and fields[0] in repos:
+            closure.setdefault(fields[0], set()).add(fields[1])
+    return {repo: sorted(nevras) for repo, nevras in closure.items()}
+
+
+def module_metadata(repo):
+    # modules.yaml of the repo as it is configured now, if it has one.
+    # The metadata is fetched into a fresh cache: dnf's own cache keeps
+    # directories of the versions synced before, and of repos whose id
+    # starts with this one.
+    tmp = tempfile.mkdtemp()
+    try:
+        subprocess.run(["sudo", "dnf", "makecache", "-q", "--repo", repo,
+                        "--setopt=cachedir=" + tmp],
+                       stdout=subprocess.DEVNULL)
+        # dnf names each cache directory <repoid>-<16 hex digits>
+        found = re.compile(re.escape(repo) + "-[0-9a-f]{16}$")
+        for name in os.listdir(tmp):
+            if not found.match(name):
+                continue
+            for path in glob.glob(os.path.join(tmp, name, "repodata",
+                                               "*modules.yaml*")):
+                opener = {".gz": gzip.open, ".xz": lzma.open}.get(
+                    os.path.splitext(path)[1], open)
+                with opener(path, "rb") as file:
+                    return file.read()
+        return None
+    finally:
+        # dnf ran as root, so its files need root to remove
+        subprocess.run(["sudo", "rm", "-rf", tmp])
+
+
+def mirror_closure(repo, nevras, dest, shaper=None, windows=()):
+    # Download part of a repo and give it its own metadata, keeping the
+    # module streams so modular filtering works on the disconnected host
+    repodest = os.path.join(dest, repo)
+    os.makedirs(repodest, exist_ok=True)
+    run_shaped(["sudo", "dnf", "download", "-q", "--repo", repo,
+                "--destdir", repodest] + nevras, repo, shaper, windows)
+    subprocess.run(["sudo", "createrepo", "-q", "--update", repodest])
+    modules = module_metadata(repo)
+    if modules:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "modules.yaml")
+            with open(path, "wb") as file:
+                file.write(modules)
+            subprocess.run(["sudo", "modifyrepo_c", "--mdtype=modules", path,
+                            os.path.join(repodest, "repodata")])
+
+
+def mirror_closures(session, closure, repos, dest):
+    # One repo at a time, dnf holds its cache lock while downloading
+    for repo in repos:
+        if repo in closure:
+            session.timed("mirror_closure:" + repo, mirror_closure, repo,
+                          closure[repo], dest, session.shaper,
+                          session.windows, path=os.path.join(dest, repo))
+
+
+def create_repo():
+    os.system("for dir in " + repodir + "; do echo processing $dir;" +
+              "cd $dir; createrepo .; cd " + os.getcwd() + "; done")
+# Unable to get subprocess to work properly
+#   subprocess.run(["for", "dir", "in", repodir, ";",
+#                   "do", "echo", "Processing $dir", ";", "cd", "$dir", ";",
+#                   "createrepo", ".", ";", "done"])
+
+
+def package_repos():
+    os.system("tar cf " + repodir + ".tar " + repodir)
+# Unable to get subprocess to work properly
+#    subprocess.run(["tar", "cf", repodir, ".tar", repodir])
+    index_bundle(repodir + ".tar")
+
+
+def index_bundle(tarpath):
+    # Record where each member's data starts so the disconnected side can
+    # seek straight to it instead of reading the whole archive
+    members = []
+    with tarfile.open(tarpath) as tar:
+        for member in tar:
+            members.append({"name": member.name,
+                            "type": member.type.decode(),
+                            "offset": member.offset_data,
+                            "size": member.size,
+                            "mode": member.mode,
+                            "mtime": member.mtime,
+                            "linkname": member.linkname})
+    data = json.dumps({"members": members})
+    file = open(tarpath + ".idx", "w")
+    file.write(data)
+    file.close()
+    with tarfile.open(tarpath, "a") as tar:
+        info = tarfile.TarInfo(repodir + "/" + tarindex)
+        info.size = len(data.encode())
+        info.mode = 0o644
+        info.mtime = int(os.path.getmtime(tarpath + ".idx"))
+        tar.addfile(info, open(tarpath + ".idx", "rb"))
+
+
+def bundle_path():
+    for path in [repodir + ".tar", "/var/lib/" + repodir + ".tar"]:
+        if os.path.exists(path):
+            return path
+    print(f"{tcolor.flb}Unable to find {repodir}.tar!")
+    print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+    exit()
+
+
+def load_index(tarpath):
+    # Prefer the sidecar, fall back to the member appended to the tarball
+    try:
+        with open(tarpath + ".idx") as file:
+            return json.load(file)["members"]
+    except FileNotFoundError:
+        pass
+    with tarfile.open(tarpath) as tar:
+        try:
+            member = tar.getmember(repodir + "/" + tarindex)
+        except KeyError:
+            print(f"{tcolor.flb}{tarpath} has no member index!")
+            print(f"{tcolor.msg}Rebuild the bundle, or extract it in full" +
+                  f" with -d{tcolor.dflt}")
+            exit()
+        return json.load(tar.extractfile(member))["members"]
+
+
+def select_members(members, patterns):
+    # Match paths relative to foreman-repos/, whole directories included
+    picked = []
+    for member in members:
+        rel = member["name"][len(repodir) + 1:]
+        for pattern in patterns:
+            if fnmatch.fnmatch(rel, pattern) or \
+                    rel.startswith(pattern.rstrip("/") + "/"):
+                picked.append(member)
+                break
+    return picked
+
+
+def copy_member(bundle, member, source, dest):
+    # Replace rather than overwrite, the file may share its inode with
+    # the live release
+    if os.path.lexists(dest):
+        os.remove(dest)
+    with open(dest, "wb") as out:
+        bundle.seek(source["offset"])
+        left = source["size"]
+        while left > 0:
+            chunk = bundle.read(min(left, 1048576))
+            if not chunk:
+                break
+            out.write(chunk)
+            left -= len(chunk)
+    os.chmod(dest, member["mode"])
+    os.utime(dest, (member["mtime"], member["mtime"]))
+
+
+def extract_members(tarpath, members, byname, destdir):
+    # Each worker holds its own handle so seeks do not interfere
+    with open(tarpath, "rb") as bundle:
+        for member in members:
+            dest = os.path.join(destdir, member["name"][len(repodir) + 1:])
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if member["type"] == tarfile.DIRTYPE.decode():
+                os.makedirs(dest, exist_ok=True)
+            elif member["type"] == tarfile.SYMTYPE.decode():
+                if os.path.lexists(dest):
+                    os.remove(dest)
+                os.symlink(member["linkname"], dest)
+            elif member["type"] == tarfile.LNKTYPE.decode():
+                # Hardlinked packages carry their data in the link target
+                copy_member(bundle, member, byname[member["linkname"]], dest)
+            else:
+                copy_member(bundle, member, member, dest)
+
+
+def extract_selected(patterns, jobs, destdir):
+    # Members are written relative to foreman-repos/, into destdir
+    tarpath = bundle_path()
+    members = load_index(tarpath)
+    byname = {m["name"]: m for m in members}
+    picked = select_members(members, patterns)
+    if len(picked) == 0:
+        print(f"{tcolor.flb}Nothing in the bundle matches " +
+              ", ".join(patterns) + f"{tcolor.dflt}")
+        exit()
+    # Split by pattern so separate repos extract in parallel
+    groups = {}
+    for member in picked:
+        rel = member["name"][len(repodir) + 1:]
+        key = next((p for p in patterns if fnmatch.fnmatch(rel, p) or
+                    rel.startswith(p.rstrip("/") + "/")), "")
+        groups.setdefault(key, []).append(member)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for result in [pool.submit(extract_members, tarpath, group, byname,
+                                   destdir) for group in groups.values()]:
+            result.result()
+    return len(picked)
+
+
+def build_repos(cfg, session, vsets):
+    # Sync shared and per version repos, then prepare them for packaging
+    profile = bundle_profiles[cfg.profile]
+    bundle = load_manifest(repodir)
+    if bundle.get("profile", cfg.profile) != cfg.profile:
+        print(f"{tcolor.flb}{repodir} holds a {bundle['profile']} bundle," +
+              f" not {cfg.profile}!")
+        print(f"{tcolor.msg}Build each profile in its own directory")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    bundle["profile"] = cfg.profile
+    packages = profile["packages"]
+    if packages is None:
+        sync_all(cfg, session, shared_repos)
+    shared = {}
+    for vfver, vkver in vsets:
+        vsetdir = os.path.join(repodir, versionsdir,
+                               version_set_name(vfver, vkver))
+        print('')
+        print(f"{tcolor.msg}Syncing Foreman {vfver} / Katello {vkver}" +
+              f" repos...{tcolor.dflt}")
+        swap_release("https://yum.theforeman.org/releases/" +
+                     vfver + "/el8/x86_64/foreman-release.rpm")
+        swap_release("https://yum.theforeman.org/katello/" + vkver +
+                     "/katello/el8/x86_64/katello-repos-latest.rpm")
+        os.makedirs(vsetdir, exist_ok=True)
+        repos = profile["repos"]
+        if packages is None:
+            sync_all(cfg, session, repos, vsetdir)
+        else:
+            closure = session.timed("package_closure", package_closure,
+                                    packages, shared_repos + repos)
+            repos = [repo for repo in repos if repo in closure]
+            mirror_closures(session, closure, repos, vsetdir)
+            for repo in shared_repos:
+                shared.setdefault(repo, set()).update(closure.get(repo, []))
+        fetch_foreman_key(vsetdir)
+        fetch_pulp_key(vsetdir)
+        add_version_set(bundle, vfver, vkver, repos)
+    if packages is not None:
+        print('')
+        print(f"{tcolor.msg}Mirroring the {cfg.profile} package closure from" +
+              " " + ", ".join(shared_repos) + f"...{tcolor.dflt}")
+        mirror_closures(session, {repo: sorted(nevras) for repo, nevras
+                                  in shared.items()}, shared_repos, repodir)
+    save_manifest(repodir, bundle)
+    session.timed("create_repo", create_repo)
+    print('')
+    print(f"{tcolor.msg}Deduplicating packages shared between" +
+          f" versions...{tcolor.dflt}")
+    linked, saved = session.timed("dedupe_packages", dedupe_packages)
+    print(f"{tcolor.ok}Linked {linked} duplicate packages" +
+          f" ({round(saved / 1048576)} MiB saved){tcolor.dflt}")
+    print('')
+    print(f"{tcolor.msg}Building dnf metadata cache for offline" +
+          f" repos...{tcolor.dflt}")
+    if session.timed("build_dnf_cache", build_dnf_cache, bundle):
+        print(f"{tcolor.ok}dnf cache built!{tcolor.dflt}")
+    print('')
+    print(f"{tcolor.msg}Syncing dnspython packages...{tcolor.dflt}")
+    file = open(repodir + "/requirements.txt", "w")
+    file.write("dnspython==1.15.0")
+    file.close()
+    os.system("pip3 download -r " + repodir + "/requirements.txt -d" + repodir)
+    os.system("sudo cp /etc/pki/rpm-gpg/* " + repodir + "/")
+    # Keep everything owned by the builder so snapshots can hardlink it
+    os.system("sudo chown -R " + str(os.getuid()) + ":" +
+              str(os.getgid()) + " " + repodir)
+    return bundle
+
+
+def take_snapshot(snapshots, stamp):
+    # Hardlink the packages into a dated snapshot; everything else is
+    # copied so later metadata rewrites cannot change the snapshot
+    snapdir = os.path.join(snapshots, stamp)
+    os.makedirs(snapdir)
+    subprocess.run(["cp", "-al", repodir, snapdir])
+    for root, dirs, files in os.walk(os.path.join(snapdir, repodir)):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(".rpm") or os.path.islink(path):
+                continue
+            shutil.copy2(path, path + ".tmp")
+            os.replace(path + ".tmp", path)
+    # Record the snapshot in its own manifest, so a delta can be checked
+    # against the release it is applied to
+    top = os.path.join(snapdir, repodir)
+    data = load_manifest(top)
+    data["snapshot"] = stamp
+    save_manifest(top, data)
+    return snapdir
+
+
+def snapshot_files(snapdir):
+    files = {}
+    top = os.path.join(snapdir, repodir)
+    for root, dirs, names in os.walk(top):
+        for name in names:
+            path = os.path.join(root, name)
+            stat = os.lstat(path)
+            files[os.path.relpath(path, snapdir)] = stat
+    return files
+
+
+def write_delta(prevdir, snapdir, deltapath):
+    # Unchanged packages share an inode with the previous snapshot; other
+    # files are compared on size and mtime
+    prev = snapshot_files(prevdir)
+    cur = snapshot_files(snapdir)
+    changed = []
+    for rel, stat in sorted(cur.items()):
+        old = prev.get(rel)
+        if old is None or (rel.endswith(".rpm") and
+                           old.st_ino != stat.st_ino) or \
+                (old.st_size, old.st_mtime) != (stat.st_size, stat.st_mtime):
+            changed.append(rel)
+    removed = sorted(rel for rel in prev if rel not in cur)
+    data = json.dumps({"base": os.path.basename(prevdir),
+                       "snapshot": os.path.basename(snapdir),
+                       "removed": removed}, indent=2).encode()
+    with tarfile.open(deltapath, "w") as tar:
+        for rel in changed:
+            tar.add(os.path.join(snapdir, rel), rel, recursive=False)
+        info = tarfile.TarInfo(repodir + "/" + deltafile)
+        info.size = len(data)
+        info.mode = 0o644
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(data))
+    return len(changed), len(removed)
+
+
+def write_status(outbox, status):
+    status["updated"] = datetime.now().isoformat(timespec="seconds")
+    path = os.path.join(outbox, "status.json")
+    file = open(path + ".tmp", "w")
+    json.dump(status, file, indent=2)
+    file.close()
+    os.replace(path + ".tmp", path)
+
+
+def prune_snapshots(snapshots, outbox, keep):
+    snaps = sorted(os.listdir(snapshots))
+    for stamp in snaps[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(snapshots, stamp))
+        # Drop the full bundle and any delta built on this snapshot
+        for name in os.listdir(outbox):
+            if name.startswith(repodir + "-") and "-" + stamp in name:
+                os.remove(os.path.join(outbox, name))
+    return sorted(os.listdir(snapshots))
+
+
+def mirror_daemon(cfg, session, vsets):
+    # Sync on a schedule, snapshot, and write full and delta bundles of
+    # each snapshot to the outbox for transfer
+    os.makedirs(cfg.snapshots, exist_ok=True)
+    os.makedirs(cfg.outbox, exist_ok=True)
+    status = {"state": "starting", "version_sets":
+              [version_set_name(f, k) for f, k in vsets]}
+    while True:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M")
+        status.update({"state": "syncing", "started": stamp})
+        write_status(cfg.outbox, status)
+        try:
+            snaps = sorted(os.listdir(cfg.snapshots))
+            session.timed("build_repos", build_repos, cfg, session, vsets)
+            snapdir = session.timed("take_snapshot", take_snapshot,
+                                    cfg.snapshots, stamp)
+            status["state"] = "packaging"
+            write_status(cfg.outbox, status)
+            full = os.path.join(cfg.outbox, repodir + "-" + stamp + ".tar")
+            session.timed("package_snapshot", subprocess.run,
+                          ["tar", "cf", full, "-C", snapdir, repodir],
+                          path=full)
+            index_bundle(full)
+            status["last_full"] = os.path.basename(full)
+            if snaps:
+                delta = os.path.join(cfg.outbox, repodir + "-delta-" +
+                                     snaps[-1] + "-" + stamp + ".tar")
+                changed, removed = session.timed(
+                    "package_delta", write_delta,
+                    os.path.join(cfg.snapshots, snaps[-1]), snapdir, delta,
+                    path=delta)
+                status["last_delta"] = os.path.basename(delta)
+                status["delta_changed"] = changed
+                status["delta_removed"] = removed
+            status["snapshots"] = prune_snapshots(cfg.snapshots, cfg.outbox,
+                                                  cfg.keep)
+            status["last_snapshot"] = stamp
+            status["state"] = "idle"
+            print(f"{tcolor.ok}Snapshot {stamp} written to" +
+                  f" {cfg.outbox}{tcolor.dflt}")
+        except Exception as err:
+            status["state"] = "failed"
+            status["error"] = str(err)
+            print(f"{tcolor.flb}Snapshot {stamp} failed: {err}{tcolor.dflt}")
+        nextrun = datetime.now() + timedelta(hours=cfg.interval)
+        status["next_run"] = nextrun.isoformat(timespec="seconds")
+        write_status(cfg.outbox, status)
+        time.sleep(max(0, (nextrun - datetime.now()).total_seconds()))
+
+
+def release_stamp():
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def releases():
+    # Staged releases, oldest first
+    if not os.path.isdir(stagedir):
+        return []
+    return sorted((name for name in os.listdir(stagedir)
+                   if os.path.isdir(os.path.join(stagedir, name)) and
+                   not name.endswith(".repos")),
+                  key=lambda name: (name != "legacy", name))
+
+
+def active_release():
+    # None until the first staged activation, or while offlinedir is
+    # still a directory from an in-place extraction
+    if not os.path.islink(offlinedir):
+        return None
+    return os.path.basename(os.readlink(offlinedir))
+
+
+def stage_bundle(stamp):
+    # Unpack the full bundle into a new release next to the live one
+    os.system("sudo mv foreman-repos.tar* /var/lib/ 2>/dev/null")
+    stage = os.path.join(stagedir, stamp)
+    subprocess.run(["sudo", "mkdir", "-p", stage])
+    subprocess.run(["sudo", "tar", "-xf", "/var/lib/" + repodir + ".tar",
+                    "-C", stage, "--strip-components=1"])
+    return stage
+
+
+def stage_extract(patterns, jobs, stamp):
+    # Hardlink the live release into a new one and extract the selected
+    # members over it; replaced files are unlinked first, so the files
+    # shared with the live release are left untouched
+    if os.geteuid() != 0:
+        print(f"{tcolor.flb}Selective extraction writes to {stagedir}" +
+              " and must run as root!")
+        print(f"{tcolor.msg}Rerun with sudo{tcolor.dflt}")
+        exit()
+    if not os.path.isdir(offlinedir):
+        print(f"{tcolor.flb}No offline repos to extract into!")
+        print(f"{tcolor.msg}Unpack the full bundle with -d first, or" +
+              f" extract files elsewhere with --dest{tcolor.dflt}")
+        exit()
+    stage = os.path.join(stagedir, stamp)
+    subprocess.run(["sudo", "mkdir", "-p", stage])
+    subprocess.run(["sudo", "cp", "-al",
+                    os.path.realpath(offlinedir) + "/.", stage])
+    count = extract_selected(patterns, jobs, stage)
+    return stage, count
+
+
+def stage_delta(deltapath, stamp):
+    # Hardlink the live release into a new one and unpack the delta over
+    # it; tar replaces existing files by unlinking them first, so the
+    # files shared with the live release are left untouched
+    if not os.path.isdir(offlinedir):
+        print(f"{tcolor.flb}No offline repos to apply the delta to!")
+        print(f"{tcolor.msg}Unpack a full bundle with -d first{tcolor.dflt}")
+        exit()
+    with tarfile.open(deltapath) as tar:
+        try:
+            member = tar.extractfile(repodir + "/" + deltafile)
+        except KeyError:
+            member = None
+        if member is None:
+            print(f"{tcolor.flb}{deltapath} is not a delta bundle!")
+            print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+            exit()
+        data = json.load(member)
+    # A delta only holds what changed since its base snapshot, so it is
+    # only complete on top of that snapshot
+    live = release_manifest(offlinedir).get("snapshot")
+    if live != data["base"]:
+        print(f"{tcolor.flb}Delta {data['base']} -> {data['snapshot']}" +
+              " does not apply to the live repos (snapshot " +
+              (live or "unknown") + ")!")
+        print(f"{tcolor.msg}Unpack the full bundle of snapshot" +
+              f" {data['snapshot']} instead{tcolor.dflt}")
+        exit()
+    stage = os.path.join(stagedir, stamp)
+    subprocess.run(["sudo", "mkdir", "-p", stage])
+    subprocess.run(["sudo", "cp", "-al",
+                    os.path.realpath(offlinedir) + "/.", stage])
+    subprocess.run(["sudo", "tar", "-xf", os.path.abspath(deltapath),
+                    "-C", stage, "--strip-components=1"])
+    for rel in data["removed"]:
+        subprocess.run(["sudo", "rm", "-f",
+                        os.path.join(stage, rel.split("/", 1)[1])])
+    subprocess.run(["sudo", "rm", "-f", os.path.join(stage, deltafile)])
+    if load_manifest(stage).get("snapshot") != data["snapshot"]:
+        print(f"{tcolor.flb}Staged release {stamp} is not snapshot" +
+              f" {data['snapshot']}, the live repos were not changed!")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        subprocess.run(["sudo", "rm", "-rf", stage])
+        exit()
+    return stage, data
+
+
+def verify_release(stage):
+    # Returns the repos in the staged release that have no metadata
+    data = release_manifest(stage)
+    if len(data["version_sets"]) == 0:
+        return [manifest]
+    repos = list(shared_repos)
+    for vset in data["version_sets"]:
+        repos += [vset["path"] + "/" + repo for repo in vset_repos(vset)]
+    return [repo for repo in repos if not os.path.isfile(
+        os.path.join(stage, repo, "repodata", "repomd.xml"))]
+
+
+def label_release(stage):
+    # One SELinux relabel of the staged tree, before it goes live
+    subprocess.run(["sudo", "restorecon", "-R", stage])
+
+
+def stage_repo_files(stamp, vset):
+    # Repo files point through the offlinedir symlink, and are kept per
+    # release so a rollback restores the matching set
+    repos = os.path.join(stagedir, stamp + ".repos")
+    with tempfile.TemporaryDirectory() as tmp:
+        write_repo_files(vset, dest=tmp)
+        subprocess.run(["sudo", "mkdir", "-p", repos])
+        for name in repo_files:
+            if os.path.exists(os.path.join(tmp, name)):
+                subprocess.run(["sudo", "cp", os.path.join(tmp, name),
+                                repos])
+    subprocess.run(["sudo", "chown", "-R", "root:", repos])
+    subprocess.run(["sudo", "restorecon", "-R", repos])
+
+
+def swap_repo_files(stamp):
+    replace_repo_files(os.path.join(stagedir, stamp + ".repos"))
+
+
+def replace_repo_files(repos):
+    # Copy the repo files next to the live ones, then rename each over
+    # its live file so dnf never reads a partial file. Other repo files
+    # are moved aside so their repo ids cannot clash.
+    for name in os.listdir("/etc/yum.repos.d"):
+        if name.endswith(".repo") and name not in repo_files:
+            path = os.path.join("/etc/yum.repos.d", name)
+            subprocess.run(["sudo", "mv", path, path + ".old"])
+    for name in repo_files:
+        live = os.path.join("/etc/yum.repos.d", name)
+        if not os.path.exists(os.path.join(repos, name)):
+            # Repos the release's profile leaves out
+            subprocess.run(["sudo", "rm", "-f", live])
+            continue
+        # A new file is owned by root and takes the directory's label
+        subprocess.run(["sudo", "cp", os.path.join(repos, name),
+                        live + ".new"])
+        subprocess.run(["sudo", "mv", "-f", live + ".new", live])
+
+
+def switch_release(stamp):
+    # Point offlinedir at the release with a rename, which is atomic
+    if os.path.isdir(offlinedir) and not os.path.islink(offlinedir):
+        # Repos extracted in place by older versions become a release
+        legacy = os.path.join(stagedir, "legacy")
+        subprocess.run(["sudo", "mv", offlinedir, legacy])
+        subprocess.run(["sudo", "mkdir", "-p", legacy + ".repos"])
+        for name in repo_files:
+            live = os.path.join("/etc/yum.repos.d", name)
+            if os.path.exists(live):
+                subprocess.run(["sudo", "cp", "-a", live, legacy + ".repos"])
+        subprocess.run(["sudo", "ln", "-sfn", os.path.basename(stagedir) +
+                        "/legacy", offlinedir])
+    tmplink = offlinedir + ".new"
+    subprocess.run(["sudo", "ln", "-sfn", os.path.basename(stagedir) + "/" +
+                    stamp, tmplink])
+    subprocess.run(["sudo", "mv", "-T", tmplink, offlinedir])
+
+
+def activate_release(stamp):
+    switch_release(stamp)
+    swap_repo_files(stamp)
+
+
+def rollback_release():
+    # Switch back to the release staged before the active one
+    current = active_release()
+    staged = releases()
+    if current not in staged or staged.index(current) == 0:
+        print(f"{tcolor.flb}No previous release to roll back to!")
+        print(f"{tcolor.msg}Staged releases: " +
+              (", ".join(staged) or "none") + f"{tcolor.dflt}")
+        exit()
+    target = staged[staged.index(current) - 1]
+    if not os.path.isdir(os.path.join(stagedir, target + ".repos")):
+        print(f"{tcolor.flb}Release {target} has no repo files!")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    activate_release(target)
+    return current, target
+
+
+def prune_releases(keep):
+    # Keep the newest releases, never the active one
+    current = active_release()
+    staged = [name for name in releases() if name != current]
+    for stamp in staged[:-(keep - 1)] if keep > 1 else staged:
+        subprocess.run(["sudo", "rm", "-rf", os.path.join(stagedir, stamp),
+                        os.path.join(stagedir, stamp + ".repos")])
+
+
+def check_repos():
+    subprocess.run(["dnf", "repolist"])
+
+
+def build_dnf_cache(bundle):
+    # dnf keys its cache on the repo baseurl, so the cache has to be built
+    # against the same /var/lib/foreman-repos paths the offline host uses.
+    # Point that path at the local repos while the cache is generated.
+    cwd = os.getcwd()
+    linked = False
+    if not os.path.exists(offlinedir):
+        os.system("sudo ln -s " + os.path.join(cwd, repodir) + " " +
+                  offlinedir)
+        linked = True
+    elif os.path.realpath(offlinedir) != os.path.join(cwd, repodir):
+        print(f"{tcolor.wrn}{offlinedir} already exists on this host," +
+              f" skipping dnf cache build{tcolor.dflt}")
+        return False
+    cachepath = os.path.join(cwd, repodir, cachedir)
+    os.system("sudo rm -rf " + cachepath)
+    os.makedirs(cachepath)
+    # The solv files are named by repo id alone, so each version set gets
+    # its own cache
+    for vset in bundle["version_sets"]:
+        with tempfile.TemporaryDirectory() as reposdir:
+            write_repo_files(vset, dest=reposdir)
+            subprocess.run(["sudo", "dnf", "makecache", "--refresh",
+                            "--releasever=8",
+                            "--setopt=reposdir=" + reposdir,
+                            "--setopt=cachedir=" +
+                            os.path.join(cachepath, vset["name"]),
+                            "--setopt=module_platform_id=platform:el8"])
+    os.system("sudo chown -R " + str(os.getuid()) + ":" +
+              str(os.getgid()) + " " + cachepath)
+    if linked:
+        os.system("sudo rm -f " + offlinedir)
+    return True
+
+
+def install_dnf_cache(vset):
+    # Seed dnf's cache with the metadata built on the connected host so the
+    # first repolist and module operations skip the full metadata load.
+    # Bundles from before per set caches hold one cache at the top.
+    cachepath = os.path.join(offlinedir, cachedir)
+    if os.path.isdir(os.path.join(cachepath, vset["name"])):
+        cachepath = os.path.join(cachepath, vset["name"])
+    elif not os.path.isdir(cachepath) or not any(
+            os.path.isfile(os.path.join(cachepath, name))
+            for name in os.listdir(cachepath)):
+        return False
+    os.system("sudo cp -a " + cachepath + "/. /var/cache/dnf/")
+    os.system("sudo chown -R root: /var/cache/dnf;" +
+              " sudo restorecon -R /var/cache/dnf")
+    return True
+
+
+def select_version_set(data, fver, kver, noprompt=False):
+    sets = data["version_sets"]
+    if len(sets) == 0:
+        print(f"{tcolor.flb}No version sets found in {manifest}!")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    if len(sets) == 1 and sets[0].get("legacy"):
+        # Nothing records which versions an old bundle holds
+        if len(fver) > 0:
+            print(f"{tcolor.wrn}The bundle has no {manifest}, unable to" +
+                  f" check it holds Foreman {fver}{tcolor.dflt}")
+        return sets[0]
+    if len(fver) > 0:
+        for vset in sets:
+            if vset["foreman"] == fver and \
+                    (len(kver) == 0 or vset["katello"] == kver):
+                return vset
+        print(f"{tcolor.flb}Foreman {fver}" +
+              (f" / Katello {kver}" if len(kver) > 0 else "") +
+              " is not in this bundle!")
+        print(f"{tcolor.msg}Bundle contains: " +
+              ", ".join(v["name"] for v in sets))
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    if len(sets) == 1:
+        return sets[0]
+    if noprompt:
+        print(f"{tcolor.flb}Unable to get the version set interactively!")
+        print(f"{tcolor.fl}Define the Foreman version, or allow prompting")
+        print(f"{tcolor.msg}Bundle contains: " +
+              ", ".join(v["name"] for v in sets))
+        print(f"{tcolor.msg}Use -h or --help for assistance{tcolor.dflt}")
+        print('')
+        exit()
+    print(f"{tcolor.pmt}Which Foreman/Katello version set should be" +
+          f" activated?{tcolor.dflt}")
+    print('')
+    for idx, vset in enumerate(sets, 1):
+        print(f"{idx}) Foreman {vset['foreman']} / Katello {vset['katello']}")
+    print('')
+    while True:
+        try:
+            idx = int(input(tcolor.pmt + "Version set: " + tcolor.dflt))
+            if 1 <= idx <= len(sets):
+                return sets[idx - 1]
+        except ValueError:
+            pass
+        print(f"{tcolor.fl}Invalid input!{tcolor.dflt}")
+
+
+def write_repo_files(vset, basedir=offlinedir, dest="."):
+    # Shared repos sit at the top of the bundle, version specific repos
+    # under the selected version set. basedir may also be a mirror URL.
+    baseurl = basedir if "://" in basedir else "file://" + basedir
+    verurl = baseurl if vset["path"] == "." else baseurl + "/" + vset["path"]
+    # Sets built before keys were kept per set use the key at the top
+    fkey = verurl + "/" + vset["gpgkey"] if "gpgkey" in vset else \
+        baseurl + "/RPM-GPG-KEY-foreman"
+    file = open(os.path.join(dest, "alma.repo"), "w")
+    file.write("[baseos]\n")
+    file.write("name=AlmaLinux 8 - BaseOS\n")
+    file.write("baseurl=" + baseurl + "/baseos\n")
+    file.write("gpgkey=" + baseurl + "/RPM-GPG-KEY-AlmaLinux\n")
+    file.write("enabled=1\n")
+    file.write("gpgcheck=1\n")
+    file.write("\n[appstream]\n")
+    file.write("name=AlmaLinux 8 - AppStream\n")
+    file.write("baseurl=" + baseurl + "/appstream\n")
+    file.write("gpgkey=" + baseurl + "/RPM-GPG-KEY-AlmaLinux\n")
+    file.write("enabled=1\n")
+    file.write("gpgcheck=1")
+    file.close()
+    # Version repos the bundle's profile left out get no section
+    repos = vset_repos(vset)
+    if "foreman" in repos:
+        file = open(os.path.join(dest, "foreman.repo"), "w")
+        file.write("[foreman]\n")
+        file.write("name=" + ("Foreman " + vset["foreman"]).rstrip() + "\n")
+        file.write("baseurl=" + verurl + "/foreman\n")
+        file.write("enabled=1\n")
+        file.write("gpgcheck=1\n")
+        file.write("gpgkey=" + fkey)
+        file.close()
+    if "foreman-plugins" in repos:
+        file = open(os.path.join(dest, "foreman-plugins.repo"), "w")
+        file.write("[foreman-plugins]\n")
+        file.write("name=" + ("Foreman plugins " +
+                   vset["foreman"]).rstrip() + "\n")
+        file.write("baseurl=" + verurl + "/foreman-plugins\n")
+        file.write("enabled=1\n")
+        file.write("gpgcheck=0\n")
+        file.write("gpgkey=" + fkey)
+        file.close()
+    sections = []
+    if "katello" in repos:
+        sections.append("[katello]\n" +
+                        "name=" + ("Katello " + vset["katello"]).rstrip() +
+                        "\n" +
+                        "baseurl=" + verurl + "/katello\n" +
+                        "enabled=1\n" +
+                        "gpgcheck=1\n" +
+                        "gpgkey=" + fkey + "\n")
+    if "katello-candlepin" in repos:
+        sections.append("[katello-candlepin]\n" +
+                        "name=Candlepin: an open source entitlement" +
+                        " management system\n" +
+                        "baseurl=" + verurl + "/katello-candlepin\n" +
+                        "gpgkey=" + fkey + "\n" +
+                        "enabled=1\n" +
+                        "gpgcheck=1\n")
+    if "pulpcore" in repos:
+        sections.append("[pulpcore]\n" +
+                        "name=pulpcore: Fetch, Upload, Organize, and Dist" +
+                        " SW Packs\n" +
+                        "baseurl=" + verurl + "/pulpcore\n" +
+                        "gpgkey=" + verurl + "/GPG-RPM-KEY-pulpcore\n" +
+                        "enabled=1\n" +
+                        "gpgcheck=1\n")
+    if sections:
+        file = open(os.path.join(dest, "katello.repo"), "w")
+        file.write("\n".join(sections).rstrip("\n"))
+        file.close()
+    if "puppet7" in repos:
+        file = open(os.path.join(dest, "puppet.repo"), "w")
+        file.write("[puppet7]\n")
+        file.write("name=Puppet 7 Repository el 8 x86_64\n")
+        file.write("baseurl=" + verurl + "/puppet7\n")
+        file.write("gpgkey=" + baseurl + "/" +
+                   "RPM-GPG-KEY-puppet7-release\n")
+        file.write("gpgkey=" + baseurl + "/" +
+                   "RPM-GPG-KEY-2025-04-06-puppet7-release\n")
+        file.write("enabled=1\n")
+        file.write("gpgcheck=1")
+        file.close()
+
+
+def build_parser():
+    arg = argparse.ArgumentParser(
+        description="Foreman repo setup script",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg.add_argument("-c", "--online", action="store_true",
+                     help="Setup repos on connected host")
+    arg.add_argument("-d", "--offline", action="store_true",
+                     help="Setup repos on offline host")
+    arg.add_argument("-a", "--noprompt", action="store_true",
+                     help="With -d, do not prompt for the version set to" +
+                     " activate")
+    arg.add_argument("-f", "--foreman", action="store",
+                     help="Foreman version. Comma separate versions to" +
+                     " build a multi-version bundle, or to select the" +
+                     " version set to activate on a disconnected host",
+                     default="")
+    arg.add_argument("-k", "--katello", action="store",
+                     help="Katello version. Comma separate versions, paired" +
+                     " in order with the Foreman versions", default="")
+    arg.add_argument("-x", "--extract", action="store", default="",
+                     help="Extract only these repos or files from the" +
+                     " bundle using its member index, comma separated" +
+                     " paths relative to foreman-repos/ (globs allowed)," +
+                     " into a new release over the live one, then exit")
+    arg.add_argument("--dest", action="store", default="",
+                     help="With -x, extract into this directory instead of" +
+                     " a new release, e.g. the wheels before a full -d")
+    arg.add_argument("-j", "--jobs", action="store", type=int, default=4,
+                     help="Parallel extraction jobs for --extract, or" +
+                     " concurrent repo syncs with --bwlimit/--window")
+    arg.add_argument("--bwlimit", action="store", default="",
+                     help="Bandwidth cap for repo syncs in bytes per second" +
+                     " (K/M/G suffixes), shared evenly by concurrent syncs")
+    arg.add_argument("--window", action="append", default=[],
+                     help="Allowed sync window as HH:MM-HH:MM, may be given" +
+                     " more than once. Syncs pause outside the windows")
+    arg.add_argument("--daemon", action="store_true",
+                     help="With -c, keep syncing on a schedule and write" +
+                     " full and delta bundles of dated snapshots to --outbox")
+    arg.add_argument("--interval", action="store", type=float, default=24,
+                     help="Hours between daemon syncs")
+    arg.add_argument("--keep", action="store", type=int, default=7,
+                     help="Number of daemon snapshots to keep")
+    arg.add_argument("--snapshots", action="store",
+                     default="foreman-snapshots",
+                     help="Directory for daemon snapshots")
+    arg.add_argument("--outbox", action="store", default="foreman-outbox",
+                     help="Directory the daemon writes bundles and status to")
+    arg.add_argument("--profile", action="store", default="server",
+                     choices=sorted(bundle_profiles),
+                     help="With -c, what the bundle carries: everything a" +
+                     " Katello server needs, or only the package closure" +
+                     " of a content proxy (foreman-proxy-content)")
+    arg.add_argument("--delta", action="store", default="",
+                     help="With -d, apply this delta bundle to the existing" +
+                     " offline repos instead of unpacking a full bundle")
+    arg.add_argument("--rollback", action="store_true",
+                     help="With -d, switch the offline repos back to the" +
+                     " previously staged release, then exit")
+    arg.add_argument("--keep-releases", dest="keep_releases", action="store",
+                     type=int, default=2,
+                     help="Number of staged offline releases to keep," +
+                     " including the live one")
+    arg.add_argument("--history", action="store", default=history.history_db,
+                     help="Run history database, empty to disable")
+    return arg
+
+
+def extract_bundle(cfg, session):
+    # Extract selected repos or files from the bundle into a new release
+    # and activate it like a full bundle, keeping the live version set.
+    # With --dest, files such as the wheels are extracted there instead,
+    # before any release exists.
+    patterns = [p.strip() for p in cfg.extract.split(",") if p.strip()]
+    print(f"{tcolor.msg}Extracting " + ", ".join(patterns) +
+          f" from the bundle...{tcolor.dflt}")
+    if len(cfg.dest) > 0:
+        os.makedirs(cfg.dest, exist_ok=True)
+        count = session.timed("extract_selected", extract_selected,
+                              patterns, cfg.jobs, cfg.dest)
+        print(f"{tcolor.ok}Extracted {count} members to" +
+              f" {cfg.dest}{tcolor.dflt}")
+        return
+    stamp = release_stamp()
+    stage, count = session.timed("stage_extract", stage_extract, patterns,
+                                 cfg.jobs, stamp)
+    print(f"{tcolor.ok}Extracted {count} members into release" +
+          f" {stamp}{tcolor.dflt}")
+    check_release(session, stamp, stage)
+    current = os.path.join(stagedir, str(active_release()) + ".repos")
+    if len(cfg.foreman) == 0 and os.path.isdir(current):
+        subprocess.run(["sudo", "cp", "-a", current,
+                        os.path.join(stagedir, stamp + ".repos")])
+    else:
+        vset = select_version_set(release_manifest(stage), cfg.foreman,
+                                  cfg.katello, cfg.noprompt)
+        print(f"{tcolor.msg}Activating {vset_label(vset)}{tcolor.dflt}")
+        stage_repo_files(stamp, vset)
+    go_live(cfg, stamp)
+    session.timed("check_repos", check_repos)
+
+
+def connected_setup(cfg):
+    # Define Foreman and Katello versions and configure online repos
+    if len(cfg.foreman) == 0:
+        cfg.foreman = prompt_version("Foreman")
+    if len(cfg.katello) == 0:
+        cfg.katello = prompt_version("Katello")
+    vsets = version_sets(cfg.foreman, cfg.katello)
+
+    print(f"{tcolor.msg}Configuring online repositories...{tcolor.dflt}")
+    print('')
+    install_repo("https://yum.puppet.com/puppet7-release-el-8.noarch.rpm")
+    enable_repo("appstream")
+    enable_repo("baseos")
+    print(f"{tcolor.ok}Repositories configured!{tcolor.dflt}")
+    print(f"{tcolor.msg}Configuring DNF Modules...{tcolor.dflt}")
+    configure_modules(cfg.profile)
+    print(f"{tcolor.ok}DNF Modules configured!{tcolor.dflt}")
+    print('')
+    print(f"{tcolor.msg}Syncing repos...{tcolor.dflt}")
+    install_package("yum-utils")
+    install_package("createrepo")
+    return vsets
+
+
+def build_bundle(cfg, session, vsets):
+    bundle = build_repos(cfg, session, vsets)
+    print(f"{tcolor.ok}Repo sync complete!{tcolor.dflt}")
+    print('')
+    print(f"{tcolor.msg}Packaging offline repos...{tcolor.dflt}")
+    session.timed("package_repos", package_repos, path=repodir + ".tar")
+    print(f"{tcolor.ok}Repos packaged!{tcolor.dflt}")
+    print(f"{tcolor.msg}Bundle contains: " +
+          ", ".join(v["name"] for v in bundle["version_sets"]))
+    print(f"{tcolor.msg}Tarball located at {repodir}.tar" +
+          f" (member index at {repodir}.tar.idx)")
+    print(f"{tcolor.pmt}Bring tarball, this script and foreman_setup/ over" +
+          " to the diconnected host and run foreman_repo_builder.py -d to install" +
+          f" or update foreman{tcolor.dflt}")
+    return bundle
+
+
+def check_release(session, stamp, stage):
+    # Verify and label a staged release; an incomplete one is removed
+    # before anything live changes
+    missing = verify_release(stage)
+    if len(missing) > 0:
+        print(f"{tcolor.flb}Staged release {stamp} is incomplete, the" +
+              " live repos were not changed!")
+        print(f"{tcolor.msg}Missing repo metadata: " + ", ".join(missing))
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        subprocess.run(["sudo", "rm", "-rf", stage])
+        exit()
+    session.timed("label_release", label_release, stage)
+
+
+def go_live(cfg, stamp):
+    previous = active_release()
+    activate_release(stamp)
+    print(f"{tcolor.ok}Release {stamp} is live" +
+          (f", roll back to {previous} with --rollback" if previous else "") +
+          f"{tcolor.dflt}")
+    prune_releases(cfg.keep_releases)
+
+
+def disconnected_setup(cfg, session):
+    # Unpack the bundle into a staged release, verify and label it, then
+    # switch the live repos over to it in one step. The activated version
+    # set is kept on the session for later phases.
+    print(f"{tcolor.msg}Configuring offline repositories...{tcolor.dflt}")
+    print('')
+    stamp = release_stamp()
+    if len(cfg.delta) > 0:
+        stage, delta = session.timed("stage_delta", stage_delta, cfg.delta,
+                                     stamp)
+        print(f"{tcolor.ok}Staged delta {delta['base']} ->" +
+              f" {delta['snapshot']}{tcolor.dflt}")
+    else:
+        stage = session.timed("stage_bundle", stage_bundle, stamp)
+    check_release(session, stamp, stage)
+    vset = select_version_set(release_manifest(stage), cfg.foreman,
+                              cfg.katello, cfg.noprompt)
+    print(f"{tcolor.msg}Activating {vset_label(vset)}" +
+          f" ({bundle_profile(stage)} bundle){tcolor.dflt}")
+    os.system("pip3 install --user -r " + stage +
+              "/requirements.txt --no-index --find-links " + stage + "/")
+    stage_repo_files(stamp, vset)
+    go_live(cfg, stamp)
+    if install_dnf_cache(vset):
+        print(f"{tcolor.ok}Pre-built dnf cache installed{tcolor.dflt}")
+    print('')
+    print(f"{tcolor.msg}Checking repos...{tcolor.dflt}")
+    session.timed("check_repos", check_repos)
+    print(f"{tcolor.ok}Repos check complete!{tcolor.dflt}")
+    session.version_set = vset
+
+
+def main(cfg, session=None):
+    if session is None:
+        session = Session("foreman_repo_builder", vars(cfg), cfg.history)
+
+    # Script init banner
+    banner("# Foreman Repo Setup Script #")
+
+    # Check platform ID to ensure it's EL8
+    platform_id()
+
+    # Ensure only one host type is selected
+    if cfg.online and cfg.offline:
+        print(f"{tcolor.flb}You cannot select both connected and" +
+              " disconnected system types!")
+        print(f"{tcolor.msg}See foreman_repo_builder.py -h for help")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    if not cfg.online and not cfg.offline:
+        print('')
+        print(f"{tcolor.flb}System type not defined!")
+        print(f"{tcolor.wrn}You must define connected or disconnected")
+        print(f"{tcolor.msg}Use -h or --help for assistance")
+        print(f"{tcolor.fl}Exiting!{tcolor.dflt}")
+        exit()
+    setup_shaping(cfg, session)
+
+    if cfg.offline and len(cfg.extract) > 0:
+        extract_bundle(cfg, session)
+        session.finish()
+        return
+
+    if cfg.offline and cfg.rollback:
+        current, target = rollback_release()
+        print(f"{tcolor.ok}Rolled back from release {current} to" +
+              f" {target}{tcolor.dflt}")
+        session.timed("check_repos", check_repos)
+        session.finish()
+        return
+
+    if cfg.online:
+        # The daemon runs unattended, so versions must be passed as arguments
+        if cfg.daemon and (len(cfg.foreman) == 0 or len(cfg.katello) == 0):
+            print(f"{tcolor.flb}Unable to get versions interactively in" +
+                  " daemon mode!")
+            print(f"{tcolor.fl}Define the Foreman and Katello arguments")
+            print(f"{tcolor.msg}Use -h or --help for assistance{tcolor.dflt}")
+            exit()
+        vsets = connected_setup(cfg)
+        if cfg.daemon:
+            print(f"{tcolor.msg}Starting mirror daemon, syncing every" +
+                  f" {cfg.interval} hours...{tcolor.dflt}")
+            mirror_daemon(cfg, session, vsets)
+        build_bundle(cfg, session, vsets)
+    else:
+        disconnected_setup(cfg, session)
+        if bundle_profile() == "proxy":
+            # foreman_installer.py only installs servers, so the proxy's
+            # module streams are set here
+            print('')
+            print(f"{tcolor.msg}Configuring DNF Modules...{tcolor.dflt}")
+            configure_modules("proxy")
+            print(f"{tcolor.ok}DNF Modules configured!{tcolor.dflt}")
+            print('')
+            print(f"{tcolor.msg}Repos are setup, execute the following" +
+                  " to install the content proxy:")
+            print(f"{tcolor.dflt}dnf install foreman-proxy-content")
+            print("foreman-installer --scenario foreman-proxy-content \\")
+            print(" --certs-tar-file <certs tarball from the Foreman server>" +
+                  " \\")
+            print(" <options printed by foreman-proxy-certs-generate>")
+            print('')
+        else:
+            print(f"{tcolor.msg}Repos are setup, run the" +
+                  " foreman_installer.py script to complete" +
+                  f" setup{tcolor.dflt}")
+
+    session.finish()
+    print(f"{tcolor.okb}Offline repo setup complete{tcolor.dflt}")
@@ -0,0 +1,265 @@
+# Background resource sampling for long install phases.
+# While a phase runs, a thread records CPU, RSS and I/O for the installer's
+# process tree, the services it configures and the whole system, so a slow
+# foreman-installer run can be put down to CPU, memory or disk.
+# Each phase writes a CSV time series and a JSON summary of the peaks next
+# to the tuning values in effect. Run standalone to sample any command:
+#   python3 -m foreman_setup.sampler -i 2 -- sudo foreman-installer ...
+
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+import subprocess
+from sys import exit
+from datetime import datetime
+
+import psutil
+
+from foreman_setup.common import tcolor
+from foreman_setup.history import samples_dir
+
+# Processes are grouped by name or command line; anything else below the
+# installer's own process is counted as "installer"
+service_groups = [("puppet", ["puppet"]),
+                  ("postgres", ["postgres", "postmaster"]),
+                  ("java", ["java", "candlepin", "tomcat"]),
+                  ("pulpcore", ["pulpcore", "gunicorn"]),
+                  ("puma", ["puma"])]
+group_names = ["installer"] + [g for g, _ in service_groups] + ["system"]
+columns = ["time", "group", "procs", "cpu_pct", "rss_mb", "read_mb_s",
+           "write_mb_s", "iowait_pct"]
+
+mb = 1048576
+
+
+def classify(proc, tree):
+    info = proc.info
+    text = " ".join([info.get("name") or ""] + (info.get("cmdline") or []))
+    for group, patterns in service_groups:
+        if any(pattern in text for pattern in patterns):
+            return group
+    if proc.pid in tree:
+        return "installer"
+    return None
+
+
+class Sampler:
+    """Samples resource use in a background thread until stopped."""
+
+    def __init__(self, interval, outdir=samples_dir, phase="install",
+                 tuning=None):
+        self.interval = float(interval)
+        self.phase = phase
+        self.tuning = tuning
+        name = datetime.now().strftime("%Y%m%d-%H%M%S") + "-" + \
+            phase.replace(":", "-").replace("/", "-")
+        self.csvpath = os.path.join(outdir, name + ".csv")
+        self.summarypath = os.path.join(outdir, name + ".json")
+        self.prev = {}
+        self.prevdisk = None
+        self.result = None
+        self.peaks = {g: {"procs": 0, "cpu_pct": 0.0, "rss_mb": 0.0,
+                          "read_mb_s": 0.0, "write_mb_s": 0.0}
+                      for g in group_names}
+        self.peaks["system"]["iowait_pct"] = 0.0
+        self.denied = set()
+        self.samples = 0
+        self.started = None
+        self.stopping = threading.Event()
+        self.thread = None
+        self.file = None
+        self.writer = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.csvpath), exist_ok=True)
+        self.file = open(self.csvpath, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+        self.started = time.time()
+        self.prev, self.prevdisk = self.collect()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def loop(self):
+        # Prime the system counters in this thread, newer psutil keeps
+        # their last values per thread
+        psutil.cpu_percent()
+        psutil.cpu_times_percent()
+        last = time.time()
+        while not self.stopping.wait(self.interval):
+            now = time.time()
+            self.record(now, self.collect(), now - last)
+            last = now
+
+    def collect(self):
+        # Cumulative counters per process, keyed so pid reuse is noticed
+        try:
+            me = psutil.Process()
+            tree = {p.pid for p in me.children(recursive=True)}
+        except psutil.Error:
+            tree = set()
+        tree.add(os.getpid())
+        cur = {}
+        for proc in psutil.process_iter(["name", "cmdline"]):
+            group = classify(proc, tree)
+            if group is None:
+                continue
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    entry = {"group": group,
+                             "cpu": times.user + times.system,
+                             "rss": proc.memory_info().rss,
+                             "read": None, "write": None}
+                    try:
+                        io = proc.io_counters()
+                        entry["read"] = io.read_bytes
+                        entry["write"] = io.write_bytes
+                    except psutil.AccessDenied:
+                        # Other users' I/O needs root; CPU and RSS do not
+                        self.denied.add(group)
+                    cur[(proc.pid, proc.create_time())] = entry
+            except (psutil.NoSuchProcess, psutil.AccessDenied,
+                    psutil.ZombieProcess):
+                continue
+        return cur, psutil.disk_io_counters()
+
+    def record(self, now, collected, elapsed):
+        cur, disk = collected
+        rows = {g: {"procs": 0, "cpu_pct": 0.0, "rss_mb": 0.0,
+                    "read_mb_s": 0.0, "write_mb_s": 0.0}
+                for g in group_names}
+        for key, entry in cur.items():
+            # Processes started since the last sample count from zero
+            old = self.prev.get(key, {"cpu": 0.0, "read": 0, "write": 0})
+            row = rows[entry["group"]]
+            row["procs"] += 1
+            row["cpu_pct"] += (entry["cpu"] - old["cpu"]) / elapsed * 100
+            row["rss_mb"] += entry["rss"] / mb
+            if entry["read"] is not None and old["read"] is not None:
+                row["read_mb_s"] += (entry["read"] - old["read"]) / \
+                    elapsed / mb
+                row["write_mb_s"] += (entry["write"] - old["write"]) / \
+                    elapsed / mb
+        system = rows["system"]
+        system["procs"] = len(psutil.pids())
+        system["cpu_pct"] = psutil.cpu_percent() * psutil.cpu_count()
+        system["rss_mb"] = psutil.virtual_memory().used / mb
+        system["iowait_pct"] = getattr(psutil.cpu_times_percent(),
+                                       "iowait", 0.0)
+        if disk and self.prevdisk:
+            system["read_mb_s"] = (disk.read_bytes -
+                                   self.prevdisk.read_bytes) / elapsed / mb
+            system["write_mb_s"] = (disk.write_bytes -
+                                    self.prevdisk.write_bytes) / elapsed / mb
+        self.prev = cur
+        self.prevdisk = disk
+        stamp = datetime.fromtimestamp(now).isoformat(timespec="seconds")
+        for group in group_names:
+            row = rows[group]
+            if row["procs"] == 0:
+                continue
+            self.writer.writerow(
+                [stamp, group, row["procs"]] +
+                ["%.1f" % row[c] for c in columns[3:7]] +
+                ["%.1f" % row["iowait_pct"] if "iowait_pct" in row else ""])
+            peak = self.peaks[group]
+            for name, value in row.items():
+                peak[name] = max(peak[name], value)
+        self.file.flush()
+        self.samples += 1
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+        if self.file:
+            self.file.close()
+        self.result = self.summary()
+        with open(self.summarypath, "w") as file:
+            json.dump(self.result, file, indent=2)
+        return self.result
+
+    def summary(self):
+        peaks = {g: {k: round(v, 1) for k, v in self.peaks[g].items()}
+                 for g in group_names if self.peaks[g]["procs"] > 0}
+        return {"phase": self.phase, "interval": self.interval,
+                "started": datetime.fromtimestamp(
+                    self.started).isoformat(timespec="seconds"),
+                "seconds": round(time.time() - self.started),
+                "samples": self.samples,
+                "mem_total_mb": round(psutil.virtual_memory().total / mb),
+                "cores": psutil.cpu_count(),
+                "io_denied": sorted(self.denied),
+                "peaks": peaks,
+                "tuning": compare_tuning(self.tuning, peaks)}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def compare_tuning(tuning, peaks):
+    # Observed peaks next to the tuning values they are bounded by
+    if not tuning:
+        return None
+    pairs = [("candlepin_heap_mb", "java", "rss_mb"),
+             ("shared_buffers_mb", "postgres", "rss_mb"),
+             ("pulp_workers", "pulpcore", "procs"),
+             ("puma_workers", "puma", "procs")]
+    result = {"profile": tuning.get("name")}
+    for setting, group, metric in pairs:
+        if setting not in tuning:
+            continue
+        observed = peaks.get(group, {}).get(metric)
+        result[setting] = {"value": tuning[setting], "group": group,
+                           "peak_" + metric: observed}
+    return result
+
+
+def show_summary(summary, path):
+    print(f"{tcolor.msg}Resource peaks for {summary['phase']}" +
+          f" ({summary['samples']} samples):{tcolor.dflt}")
+    for group, peak in summary["peaks"].items():
+        print(f"{group:<10} cpu {peak['cpu_pct']:>7}%  rss" +
+              f" {peak['rss_mb']:>9} MB  read {peak['read_mb_s']:>7}" +
+              f" MB/s  write {peak['write_mb_s']:>7} MB/s")
+    if summary["io_denied"]:
+        print(f"{tcolor.wrn}I/O not readable without root for: " +
+              ", ".join(summary["io_denied"]) + f"{tcolor.dflt}")
+    print(f"{tcolor.msg}Time series and summary: {tcolor.dflt}" +
+          os.path.splitext(path)[0] + ".{csv,json}")
+    print('')
+
+
+def main():
+    arg = argparse.ArgumentParser(
+        description="Sample resource use while a command runs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg.add_argument("-i", "--interval", action="store", type=float,
+                     default=5, help="Seconds between samples")
+    arg.add_argument("-o", "--out", action="store", default=samples_dir,
+                     help="Directory for the time series and summary")
+    arg.add_argument("-p", "--phase", action="store", default="command",
+                     help="Name used for the output files")
+    arg.add_argument("command", nargs=argparse.REMAINDER,
+                     help="Command to run, after --")
+    flg = arg.parse_args()
+    cmd = flg.command[1:] if flg.command[:1] == ["--"] else flg.command
+    if len(cmd) == 0:
+        arg.error("no command given")
+    sampler = Sampler(flg.interval, flg.out, flg.phase)
+    with sampler:
+        rc = subprocess.call(cmd)
+    show_summary(sampler.result, sampler.summarypath)
+    exit(rc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# Bandwidth shaping and sync windows for repo syncs.
+# Every concurrent repo sync goes through its own local proxy; the proxies
+# share one bandwidth cap, split evenly between the repos syncing at the
+# time. Syncs outside the allowed windows are stopped and resumed later.
+# Run standalone to test the throttling against any local HTTP server:
+#   python3 -m foreman_setup.throttle --rate 1M --port 8899
+#   curl -x http://127.0.0.1:8899 -o /dev/null http://127.0.0.1:8000/file
+
+import time
+import select
+import socket
+import argparse
+import threading
+import subprocess
+import socketserver
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+chunk = 16384
+
+
+def parse_rate(rate):
+    # Bytes per second with optional K, M or G suffix
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    rate = str(rate).strip().upper().rstrip("B")
+    if rate[-1:] in units:
+        return int(float(rate[:-1]) * units[rate[-1]])
+    return int(float(rate))
+
+
+def parse_window(window):
+    # "HH:MM-HH:MM", wrapping past midnight when the end is before the start
+    start, end = window.split("-")
+    start = datetime.strptime(start.strip(), "%H:%M").time()
+    end = datetime.strptime(end.strip(), "%H:%M").time()
+    return start, end
+
+
+def in_window(windows, now=None):
+    if not windows:
+        return True
+    now = (now or datetime.now()).time()
+    for start, end in windows:
+        if start <= end and start <= now < end:
+            return True
+        if start > end and (now >= start or now < end):
+            return True
+    return False
+
+
+def next_window(windows, now=None):
+    # Start of the next allowed window, to the minute
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    for minute in range(1, 24 * 60 + 1):
+        when = now + timedelta(minutes=minute)
+        if in_window(windows, when):
+            return when
+    return now
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at rate bytes per second."""
+
+    def __init__(self, rate, burst=None):
+        self.lock = threading.Lock()
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate / 4, chunk * 4))
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def consume(self, nbytes):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= nbytes:
+                    self.tokens -= nbytes
+                    return
+                wait = (nbytes - self.tokens) / self.rate
+            time.sleep(min(wait, 1))
+
+
+class ProxyHandler(socketserver.StreamRequestHandler):
+    # Unbuffered so nothing past the request headers is read ahead
+    rbufsize = 0
+
+    def handle(self):
+        request = self.rfile.readline(65537)
+        parts = request.decode("latin-1").split()
+        if len(parts) != 3:
+            return
+        method, target, version = parts
+        headers = []
+        while True:
+            line = self.rfile.readline(65537)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name = line.split(b":", 1)[0].strip().lower()
+            if not name.startswith(b"proxy-") and \
+                    name not in (b"connection", b"keep-alive"):
+                headers.append(line)
+        try:
+            if method == "CONNECT":
+                host, port = target.rsplit(":", 1)
+                upstream = socket.create_connection((host, int(port)), 60)
+                self.wfile.write(b"HTTP/1.1 200 Connection established" +
+                                 b"\r\n\r\n")
+            else:
+                url = urlsplit(target)
+                upstream = socket.create_connection(
+                    (url.hostname, url.port or 80), 60)
+                path = (url.path or "/") + \
+                    ("?" + url.query if url.query else "")
+                # Only the first request is rewritten, so the connection
+                # is closed after one response rather than kept alive for
+                # requests the raw pipe would pass on unchanged
+                upstream.sendall(f"{method} {path} {version}\r\n".encode() +
+                                 b"".join(headers) +
+                                 b"Connection: close\r\n\r\n")
+        except OSError:
+            self.wfile.write(b"HTTP/1.1 502 Bad Gateway\r\n\r\n")
+            return
+        with upstream:
+            self.pipe(self.connection, upstream)
+
+    def pipe(self, client, upstream):
+        # Only the download direction is shaped
+        bucket = self.server.bucket
+        socks = [client, upstream]
+        while True:
+            ready, _, broken = select.select(socks, [], socks, 60)
+            if broken or not ready:
+                return
+            for sock in ready:
+                data = sock.recv(chunk)
+                if not data:
+                    return
+                if sock is upstream:
+                    bucket.consume(len(data))
+                    client.sendall(data)
+                else:
+                    upstream.sendall(data)
+
+
+class ThrottleProxy(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, bucket, port=0):
+        super().__init__(("127.0.0.1", port), ProxyHandler)
+        self.bucket = bucket
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+
+class Shaper:
+    """Shares one bandwidth cap evenly between the repos syncing at once."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def _rebalance(self):
+        for bucket in self.buckets.values():
+            bucket.set_rate(self.rate / len(self.buckets))
+
+    @contextmanager
+    def session(self, name):
+        # Start a proxy for one repo; yields the proxy URL for reposync
+        with self.lock:
+            bucket = TokenBucket(self.rate / (len(self.buckets) + 1))
+            self.buckets[name] = bucket
+            self._rebalance()
+        proxy = ThrottleProxy(bucket)
+        thread = threading.Thread(target=proxy.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield proxy.url
+        finally:
+            proxy.shutdown()
+            proxy.server_close()
+            with self.lock:
+                del self.buckets[name]
+                if self.buckets:
+                    self._rebalance()
+
+
+def run_windowed(cmd, windows, poll=30, notify=print):
+    # Run cmd only inside the allowed windows. At a window edge the command
+    # is stopped and rerun when the next window opens; reposync keeps the
+    # packages it already has, so the rerun resumes the sync.
+    while True:
+        if not in_window(windows):
+            start = next_window(windows)
+            notify("Outside sync window, paused until " +
+                   start.strftime("%H:%M"))
+            while not in_window(windows):
+                time.sleep(poll)
+        proc = subprocess.Popen(cmd)
+        while proc.poll() is None:
+            if not in_window(windows):
+                proc.terminate()
+                try:
+                    proc.wait(60)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                break
+            time.sleep(min(poll, 5))
+        else:
+            return proc.returncode
+
+
+def main():
+    arg = argparse.ArgumentParser(
+        description="Throttling proxy for testing bandwidth shaping",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg.add_argument("-r", "--rate", action="store", default="1M",
+                     help="Bandwidth cap in bytes per second (K/M/G)")
+    arg.add_argument("-p", "--port", action="store", type=int, default=8899,
+                     help="Port to listen on")
+    flg = arg.parse_args()
+    proxy = ThrottleProxy(TokenBucket(parse_rate(flg.rate)), flg.port)
+    print("Throttling proxy listening on " + proxy.url)
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
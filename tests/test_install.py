@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from foreman_setup import install
+from foreman_setup.config import InstallConfig, Session
+
+
+class InstallPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(
+            install, "install_state",
+            os.path.join(self.tmp.name, "install_state.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.params = {"--tuning": "default",
+                       "--foreman-initial-location": "loc",
+                       "--foreman-initial-organization": "org",
+                       "--foreman-initial-admin-username": "admin"}
+
+    def test_first_run_is_full(self):
+        self.assertEqual(install.install_plan(self.params, "pkgs"), [])
+
+    def test_unchanged_run_is_skipped(self):
+        install.save_install_state(self.params, "pkgs")
+        self.assertIsNone(install.install_plan(self.params, "pkgs"))
+
+    def test_changed_parameter_is_narrowed(self):
+        install.save_install_state(self.params, "pkgs")
+        params = dict(self.params, **{"--tuning": "medium"})
+        self.assertEqual(install.install_plan(params, "pkgs"),
+                         ["--tuning", "medium"])
+
+    def test_dropped_parameter_is_full(self):
+        install.save_install_state(dict(self.params, **{"custom-hiera": "x"}),
+                                   "pkgs")
+        self.assertEqual(install.install_plan(self.params, "pkgs"), [])
+
+    def test_changed_packages_are_full(self):
+        install.save_install_state(self.params, "pre")
+        self.assertEqual(install.install_plan(self.params, "post"), [])
+
+    def test_rerun_after_install_is_skipped(self):
+        # The installer pulls in packages, so the state must hold the
+        # fingerprint taken after it ran
+        cfg = InstallConfig(sample_interval=0, history="")
+        with mock.patch.object(install, "enable_fw_svc"), \
+                mock.patch.object(install, "fw_reload"), \
+                mock.patch.object(install, "write_tuning",
+                                  return_value=False), \
+                mock.patch.object(install, "katello_install",
+                                  return_value=2), \
+                mock.patch.object(install, "package_versions",
+                                  side_effect=["pre", "post"]):
+            install.foreman_install(cfg, Session("test", dbpath=""))
+        params = install.install_params(cfg)
+        self.assertIsNone(install.install_plan(params, "post"))
+
+
+if __name__ == "__main__":
+    unittest.main()
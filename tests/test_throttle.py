@@ -0,0 +1,88 @@
+import time
+import socket
+import threading
+import unittest
+import socketserver
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from foreman_setup.throttle import Shaper, chunk
+
+size = 256 * 1024
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"x" * size
+
+    def do_GET(self):
+        self.server.seen.append((self.path, self.headers.get("Connection")))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Origin(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ThrottleProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.origin = Origin(("127.0.0.1", 0), FileHandler)
+        self.origin.seen = []
+        threading.Thread(target=self.origin.serve_forever,
+                         daemon=True).start()
+        self.url = "http://127.0.0.1:%d" % self.origin.server_address[1]
+
+    def tearDown(self):
+        self.origin.shutdown()
+        self.origin.server_close()
+
+    def test_rate(self):
+        rate = 128 * 1024
+        with Shaper(rate).session("test") as proxy:
+            opener = urllib.request.build_opener(
+                urllib.request.ProxyHandler({"http": proxy}))
+            start = time.monotonic()
+            data = opener.open(self.url + "/file", timeout=30).read()
+            elapsed = time.monotonic() - start
+        self.assertEqual(len(data), size)
+        # The bucket starts full, so the first burst is not delayed
+        burst = max(rate / 4, chunk * 4)
+        self.assertGreaterEqual(elapsed, (size - burst) / rate * 0.9)
+
+    def test_one_response_per_connection(self):
+        with Shaper(1024 ** 3).session("test") as proxy:
+            port = int(proxy.rsplit(":", 1)[1])
+            client = socket.create_connection(("127.0.0.1", port), 5)
+            request = ("GET %s/%s HTTP/1.1\r\nHost: 127.0.0.1\r\n" +
+                       "Proxy-Connection: keep-alive\r\n" +
+                       "Connection: keep-alive\r\n\r\n")
+            client.sendall((request % (self.url, "first")).encode())
+            received = b""
+            sent = False
+            try:
+                while True:
+                    data = client.recv(65536)
+                    if not data:
+                        break
+                    received += data
+                    if not sent and received.endswith(FileHandler.body):
+                        # A kept alive connection would answer this too
+                        client.sendall(
+                            (request % (self.url, "second")).encode())
+                        sent = True
+            except socket.timeout:
+                pass
+            client.close()
+        self.assertEqual(received.count(b"HTTP/1.1 200"), 1)
+        self.assertEqual(self.origin.seen, [("/first", "close")])
+
+
+if __name__ == "__main__":
+    unittest.main()